@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import data_scraper
+import http_client
+import metrics
+from checkpoint import RowJournal, page_signature
+
+
+class AsyncFetcher:
+    """Issue GET requests from coroutines through the shared per-host sessions.
+
+    The pooled keep-alive sessions in http_client do the I/O on a thread pool,
+    while an asyncio.Semaphore per host bounds how many requests are in flight.
+    """
+
+    def __init__(self, host_limit=None, card_index=None, use_set_listing=False,
+                 resume=False, crawl_state=None, incremental=False, jsonl=True):
+        self.host_limit = host_limit or http_client.get_host_limit()
+        self.card_index = card_index
+        self.use_set_listing = use_set_listing
+        self.resume = resume
+        self.crawl_state = crawl_state
+        self.incremental = incremental
+        self.jsonl = jsonl
+        self._limits = {}
+
+    async def get(self, url, revalidate=False):
+        host = http_client.host_of(url)
+        limit = self._limits.get(host)
+        if limit is None:
+            limit = self._limits[host] = asyncio.Semaphore(self.host_limit)
+        async with limit:
+            return await asyncio.to_thread(http_client.get, url, revalidate)
+
+
+async def get_civilization_and_japanese_name(fetcher, reference_url):
+    try:
+        response = await fetcher.get(reference_url)
+        if response.status_code == 200:
+            return await asyncio.to_thread(data_scraper.extract_civilization_and_japanese_name, response.text)
+        else:
+            return "Failed to retrieve", "Failed to retrieve"
+    except Exception as e:
+        print(f"Error fetching Civilization and Japanese Name: {e}")
+        return "Error", "Error"
+
+
+async def get_card_metadata(fetcher, reference_url):
+    card_index = fetcher.card_index
+    if card_index is not None:
+        value = card_index.get(reference_url)
+        if value is not None:
+            return value
+    value = await get_civilization_and_japanese_name(fetcher, reference_url)
+    if card_index is not None:
+        card_index.add(reference_url, *value)
+    return value
+
+
+async def fetch_price_map(fetcher, search_term):
+    complete_url = f"{data_scraper.YUYUTEI_SEARCH_URL}{search_term}"
+    try:
+        response = await fetcher.get(complete_url)
+    except http_client.OfflineCacheMiss:
+        return {}
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch URL: {complete_url}, status code: {response.status_code}")
+    return await asyncio.to_thread(data_scraper.extract_price_map, response.text)
+
+
+async def fetch_highest_price(fetcher, jap_name, card_id, search_term=None):
+    complete_url = data_scraper.build_price_search_url(jap_name, card_id, search_term)
+    try:
+        response = await fetcher.get(complete_url)
+    except http_client.OfflineCacheMiss:
+        return -1
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch URL: {complete_url}, status code: {response.status_code}")
+    return await asyncio.to_thread(data_scraper.extract_highest_price, response.text, card_id)
+
+
+async def iter_contents(fetcher, entries, set_prices=None, journal=None):
+    plan = [(english_name, item_link, rarity, card_id)
+            for english_name, item_link, printings in entries
+            for rarity, card_id in printings]
+    contents = [journal.completed_row(no, item_link, card_id) if journal else None
+                for no, (_, item_link, _, card_id) in enumerate(plan, start=1)]
+
+    links = list(dict.fromkeys(item_link for (_, item_link, _, _), row in zip(plan, contents) if row is None))
+    results = await asyncio.gather(*(get_card_metadata(fetcher, link) for link in links))
+    metadata = dict(zip(links, results))
+
+    pending = []
+    for no, ((english_name, item_link, rarity, card_id), row) in enumerate(zip(plan, contents), start=1):
+        if row is None:
+            civilization, japanese_name = metadata[item_link]
+            pending.append((no, (english_name, japanese_name, rarity, card_id, item_link, civilization)))
+
+    # Prices already known from the set listing need no request, the rest are
+    # answered by one yuyu-tei search per card name for all of its printings
+    set_prices = set_prices or {}
+    search_terms = [None if row[3] in set_prices else data_scraper.find_consecutive_japanese(row[1]) for _, row in pending]
+    unique_terms = [term for term in dict.fromkeys(search_terms) if term is not None]
+    price_maps = dict(zip(unique_terms, await asyncio.gather(*(fetch_price_map(fetcher, term) for term in unique_terms))))
+
+    async def resolve_row(no, row, search_term):
+        if search_term is None:
+            price = set_prices[row[3]]
+        elif row[3] in price_maps[search_term]:
+            price = price_maps[search_term][row[3]]
+        else:
+            price = await fetch_highest_price(fetcher, row[1], row[3], search_term)
+        row = row + (price,)
+        if journal:
+            journal.record(no, row)
+        return row
+
+    # Rows are scheduled together and yielded in order as each one completes
+    tasks = {no: asyncio.ensure_future(resolve_row(no, row, term)) for (no, row), term in zip(pending, search_terms)}
+    try:
+        for no, row in enumerate(contents, start=1):
+            yield row if row is not None else await tasks[no]
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+def _parse_set_page(html, url):
+    h2 = data_scraper.parse_set_page(html)
+    if h2 is None:
+        return None, None
+    signature = page_signature(html, data_scraper.section_html(h2))
+    return data_scraper.parse_contents_section(h2, url), signature
+
+
+# Async counterpart of data_scraper.scrape_website, producing the same CSV and JSON Lines files
+async def scrape_website(fetcher, url, key):
+    start_time = time.time()
+
+    response = await fetcher.get(url, revalidate=fetcher.incremental)
+    if response.status_code != 200:
+        print(f"[{key}] Failed to fetch the webpage. Status code: {response.status_code}")
+        return None
+
+    entries, signature = await asyncio.to_thread(_parse_set_page, response.text, url)
+    if entries is None:
+        print(f"[{key}] Contents section not found.")
+        return None
+
+    crawl_state = fetcher.crawl_state
+    if fetcher.incremental and crawl_state and crawl_state.is_unchanged(key, signature) \
+            and os.path.exists(data_scraper.set_csv_filename(key)):
+        print(f"[{key}] has not changed since the last run, skipping.")
+        return None
+
+    journal = RowJournal(key, resume=fetcher.resume)
+    if journal.resumed_rows:
+        print(f"[{key}] Resuming with {journal.resumed_rows} rows already done.")
+    try:
+        set_prices = await asyncio.to_thread(data_scraper.fetch_set_price_map, key) if fetcher.use_set_listing else None
+        with data_scraper.open_set_writer(key, fetcher.jsonl) as writer:
+            no = 0
+            async for row in iter_contents(fetcher, entries, set_prices, journal):
+                no += 1
+                data_scraper.write_row(writer, no, key, row)
+    finally:
+        journal.close()
+    if not writer.count:
+        print(f"[{key}] No items found in the Contents section.")
+        return None
+
+    csv_filename = data_scraper.set_csv_filename(key)
+    journal.discard()
+    if crawl_state:
+        crawl_state.update(key, signature)
+    print(f"[{key}] Contents saved to {csv_filename}")
+    print(f"[{key}] Scraping completed in {time.time() - start_time:.2f} seconds.")
+    return csv_filename
+
+
+async def scrape_sets(sets, workers=http_client.DEFAULT_WORKERS, host_limit=None, card_index=None, use_set_listing=False,
+                      resume=False, crawl_state=None, incremental=False, jsonl=True):
+    """Scrape every {key: url} in sets concurrently and return {key: csv_filename or None}."""
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+    fetcher = AsyncFetcher(host_limit, card_index, use_set_listing, resume, crawl_state, incremental, jsonl)
+    async def scrape_one(key, url):
+        print(f"Scraping data for {key}...")
+        try:
+            # Each set runs as its own task, so the scope covers only its own requests
+            with metrics.set_scope(key):
+                return await scrape_website(fetcher, url, key)
+        except Exception as e:
+            print(f"[{key}] Scraping failed: {e}")
+            return None
+
+    results = await asyncio.gather(*(scrape_one(key, url) for key, url in sets.items()))
+    return dict(zip(sets, results))
+
+
+def run(sets, workers=http_client.DEFAULT_WORKERS, host_limit=None, card_index=None, use_set_listing=False,
+        resume=False, crawl_state=None, incremental=False, jsonl=True):
+    try:
+        return asyncio.run(scrape_sets(sets, workers, host_limit, card_index, use_set_listing,
+                                       resume, crawl_state, incremental, jsonl))
+    finally:
+        http_client.close_sessions()
@@ -0,0 +1,163 @@
+"""Regenerate the HTML fixtures replayed by run_benchmarks.py.
+
+The pages mirror the markup the scrapers read on duelmasters.fandom.com and
+yuyu-tei.jp (infobox wikitables, the "Contents" lists, card-list3 blocks),
+wrapped in the navigation, scripts and footers that make up most of a real page.
+They are generated rather than saved so the suite never needs network access.
+"""
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SET_KEY = "DM24-RP1"
+SET_SIZE = 150
+
+KANA = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+KANJI = "龍王帝神光闇火水自然魔界竜剣聖邪鬼天星月夜"
+CIVILIZATIONS = ["Light", "Water", "Darkness", "Fire", "Nature", "Fire/Nature", "Light/Water", "Zero"]
+RARITIES = [
+    ("Over Rare", "OR", 2),
+    ("Secret Rare", "㊙", 8),
+    ("Super Rare / Super Rare Treasure", "S", 10),
+    ("Very Rare", "V", 12),
+    ("Rare", "R", 20),
+    ("Uncommon", "U", 30),
+    ("Common", "C", 68),
+]
+
+
+def japanese_name(rng):
+    return "".join(rng.choice(KANJI) for _ in range(2)) + "".join(rng.choice(KANA) for _ in range(rng.randint(3, 7)))
+
+
+def page(title, article, revision=1234567):
+    """Wrap an article body in the chrome of a fandom page."""
+    nav = "".join(
+        f'<li class="wds-dropdown__item"><a href="/wiki/Nav_{i}" data-tracking="nav-{i}">Navigation {i}</a></li>'
+        for i in range(400)
+    )
+    scripts = "".join(f"<script>window.__ads_{i}={{slot:{i},sizes:[[300,250],[728,90]]}};</script>" for i in range(60))
+    footer = "".join(f'<div class="footer-item"><a href="/wiki/Footer_{i}">Footer link {i}</a></div>' for i in range(150))
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><title>{title} | Duel Masters Wiki | Fandom</title>'
+        f'<script>RLCONF={{"wgPageName":"{title}","wgRevisionId":{revision},"wgCurRevisionId":{revision}}};</script>'
+        f"{scripts}</head><body><nav><ul>{nav}</ul></nav>"
+        f'<main class="page"><div class="mw-parser-output">{article}</div></main>'
+        f"<footer>{footer}</footer></body></html>"
+    )
+
+
+def card_infobox(name, jp_name, civilization, rng):
+    reading = "".join(rng.choice("あいうえおかきくけこ") for _ in range(3))
+    return (
+        '<table class="wikitable" style="width:350px">'
+        f'<tr><th colspan="2">{name}<br/><small>{jp_name[:2]}<ruby><rb>{jp_name[2]}</rb><rt>{reading}</rt></ruby>{jp_name[3:]}</small></th></tr>'
+        f'<tr><td colspan="2"><a href="/wiki/File:{name}.jpg"><img src="https://static.example/{name}.jpg"/></a></td></tr>'
+        f'<tr><td>Civilization</td><td><a href="/wiki/{civilization}_Civilization">{civilization}</a></td></tr>'
+        '<tr><td>Card Type</td><td><a href="/wiki/Creature">Creature</a></td></tr>'
+        f"<tr><td>Mana Cost</td><td>{rng.randint(1, 9)}</td></tr>"
+        '<tr><td>Race</td><td><a href="/wiki/Armored_Dragon">Armored Dragon</a></td></tr>'
+        '<tr><td>English Text</td><td>■ Speed attacker<br/>■ When you put this creature into the battle zone, draw a card.</td></tr>'
+        f"<tr><td>Power</td><td>{rng.randint(1, 20) * 1000}</td></tr>"
+        "<tr><td>Mana Number</td><td>1</td></tr></table>"
+    )
+
+
+def card_page(name, rng, twinpact=False):
+    article = card_infobox(name, japanese_name(rng), rng.choice(CIVILIZATIONS), rng)
+    if twinpact:
+        article += card_infobox(name + " (Spell)", japanese_name(rng), rng.choice(CIVILIZATIONS), rng)
+    article += "".join(f"<h2><span class=\"mw-headline\">Section {i}</span></h2><p>{'Lorem ipsum dolor sit amet. ' * 20}</p>" for i in range(12))
+    return page(name, article)
+
+
+def set_entries():
+    entries = []
+    no = 1
+    for rarity, prefix, count in RARITIES:
+        for i in range(1, count + 1):
+            if no > SET_SIZE:
+                break
+            entries.append((rarity, f"Card_{no:03d}", f"{prefix}{i}/{prefix}{count}"))
+            no += 1
+    return entries
+
+
+def set_page():
+    article = '<h2><span class="mw-headline" id="Details">Details</span></h2><p>Released 2024.</p>'
+    article += '<h2><span class="mw-headline" id="Contents">Contents</span></h2>'
+    current = None
+    items = []
+    for rarity, card, card_id in set_entries():
+        if rarity != current:
+            if items:
+                article += "<ul>" + "".join(items) + "</ul>"
+                items = []
+            article += f"<p>{rarity}</p>"
+            current = rarity
+        name = card.replace("_", " ")
+        items.append(f'<li><a href="/wiki/{card}" title="{name}">{name}</a> {card_id}</li>')
+    article += "<ul>" + "".join(items) + "</ul>"
+    article += '<h2><span class="mw-headline" id="Gallery">Gallery</span></h2>'
+    article += "".join(f'<div class="gallerybox"><img src="https://static.example/{i}.jpg"/></div>' for i in range(150))
+    return page(f"{SET_KEY}", article)
+
+
+def era_page():
+    products = "".join(f'<li><a href="/wiki/Product_List_{i}">Product list {i}</a></li>' for i in range(6))
+    article = ('<h2><span class="mw-headline">Overview</span></h2><p>Era overview.</p>'
+               f'<h2><span class="mw-headline" id="Products">Products</span></h2><ul>{products}</ul>'
+               '<h2><span class="mw-headline">Trivia</span></h2><p>Trivia.</p>')
+    return page("Win_Era", article)
+
+
+def product_page(rng):
+    sets = "".join(
+        f'<li><a href="/wiki/DM24-{kind}{i}_Set_{i}">DM24-{kind}{i} Set Name {i}</a></li>'
+        for kind in ("RP", "EX", "BD", "SD") for i in range(1, 5)
+    )
+    article = (f'<h2><span class="mw-headline" id="List_of_Sets">List of Sets</span></h2><ul>{sets}</ul>'
+               '<h2><span class="mw-headline">See also</span></h2><p>More.</p>')
+    return page("Product_List", article)
+
+
+def yuyutei_page(cards):
+    blocks = []
+    for rarity, chunk in cards:
+        cols = "".join(
+            '<div class="col-md"><div class="card-product position-relative mt-4">'
+            f'<img class="card img-fluid" src="https://img.example/{card_id}.jpg"/>'
+            f'<span class="d-block border border-dark p-1 w-100 text-center my-2">{card_id}</span>'
+            f'<a href="https://yuyu-tei.jp/sell/dm/card/{SET_KEY.lower()}/{n}"><h4 class="text-primary fw-bold">{name}</h4></a>'
+            f'<strong class="d-block text-end{" text-danger" if n % 7 == 0 else ""}">{price:,}円</strong>'
+            '<label class="cart_sell_zaiko">在庫 : 3 点</label></div></div>'
+            for n, (card_id, name, price) in enumerate(chunk)
+        )
+        blocks.append(f'<div id="card-list3" class="py-4 cards-list"><h3>{rarity}</h3><div class="row">{cols}</div></div>')
+    header = "".join(f'<li class="nav-item"><a href="/sell/dm/s/item{i}">Item {i}</a></li>' for i in range(300))
+    return f'<!DOCTYPE html><html><head><title>yuyu-tei</title></head><body><header><ul>{header}</ul></header>{"".join(blocks)}</body></html>'
+
+
+def main():
+    rng = random.Random(24)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    fixtures = {
+        "fandom_set.html": set_page(),
+        "fandom_card.html": card_page("Card 001", rng),
+        "fandom_card_twinpact.html": card_page("Card 002", rng, twinpact=True),
+        "fandom_era.html": era_page(),
+        "fandom_product.html": product_page(rng),
+    }
+    listing = [(rarity, [(card_id.replace("㊙", "(秘)"), japanese_name(rng), rng.randint(1, 300) * 10)
+                         for r, _, card_id in set_entries() if r == rarity])
+               for rarity, _, _ in RARITIES]
+    fixtures["yuyutei_set_listing.html"] = yuyutei_page(listing)
+    fixtures["yuyutei_search.html"] = yuyutei_page([(rarity, chunk[:4]) for rarity, chunk in listing])
+    for filename, html in fixtures.items():
+        with open(os.path.join(FIXTURE_DIR, filename), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"{filename}: {len(html.encode('utf-8')) // 1024} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Offline benchmarks for the scraping hot paths.
+
+Every request is answered from benchmarks/fixtures through a requests transport
+adapter, so the numbers measure fetching overhead, parsing and row building
+without any network access. Run from the repository root:
+
+    python benchmarks/run_benchmarks.py [--repeat N] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+sys.path.insert(0, REPO_DIR)
+
+import data_scraper  # noqa: E402
+import http_client  # noqa: E402
+import list_scraper  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+
+FANDOM = "https://duelmasters.fandom.com"
+SET_KEY = "DM24-RP1"
+SET_URL = f"{FANDOM}/wiki/{SET_KEY}_Abyss_Revolution"
+
+
+class FixtureAdapter(BaseAdapter):
+    """Transport adapter that replays the saved fandom and yuyu-tei pages."""
+
+    def __init__(self):
+        super().__init__()
+        self.pages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._fixtures = {}
+        for filename in os.listdir(FIXTURE_DIR):
+            with open(os.path.join(FIXTURE_DIR, filename), "rb") as f:
+                self._fixtures[filename] = f.read()
+
+    def route(self, url):
+        parts = urlparse(url)
+        if parts.netloc == "yuyu-tei.jp":
+            return "yuyutei_search.html" if parts.path.endswith("/search") else "yuyutei_set_listing.html"
+        name = parts.path.rsplit("/", 1)[-1]
+        if name.endswith("_Era"):
+            return "fandom_era.html"
+        if name.startswith("Product_"):
+            return "fandom_product.html"
+        if name.startswith("DM"):
+            return "fandom_set.html"
+        # Every fifth card is a twinpact with two infobox tables
+        return "fandom_card_twinpact.html" if sum(map(ord, name)) % 5 == 0 else "fandom_card.html"
+
+    def send(self, request, **kwargs):
+        body = self._fixtures[self.route(request.url)]
+        with self._lock:
+            self.pages += 1
+            self.bytes += len(body)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def card_urls(count):
+    return [f"{FANDOM}/wiki/Card_{no:03d}" for no in range(1, count + 1)]
+
+
+def bench_card_pages(count=150):
+    for url in card_urls(count):
+        data_scraper.get_civilization_and_japanese_name(url)
+    return count
+
+
+def bench_price_search(count=150):
+    for no in range(1, count + 1):
+        data_scraper.fetch_highest_price("龍王エルボロム", f"R{no}/R20")
+    return count
+
+
+def bench_scrape_website():
+    data_scraper.scrape_website(SET_URL, SET_KEY)
+    with open(data_scraper.set_csv_filename(SET_KEY), encoding="utf-8") as f:
+        return sum(1 for _ in f) - 1
+
+
+def bench_list_traversal():
+    set_lists = list_scraper.scrape_eras([f"{FANDOM}/wiki/Win_Era"])
+    list_scraper.write_set_lists(set_lists, "set_lists.json")
+    return len(set_lists)
+
+
+BENCHMARKS = [
+    ("get_civilization_and_japanese_name", bench_card_pages),
+    ("fetch_highest_price", bench_price_search),
+    ("scrape_website", bench_scrape_website),
+    ("list_scraper traversal", bench_list_traversal),
+]
+
+
+def run_benchmark(adapter, func, repeat):
+    """Best wall time over repeat runs, then one traced run for peak memory."""
+    best = None
+    for _ in range(repeat):
+        adapter.pages = adapter.bytes = 0
+        start = time.perf_counter()
+        rows = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, rows, adapter.pages, adapter.bytes)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    elapsed, rows, pages, size = best
+    return {
+        "seconds": round(elapsed, 4),
+        "pages": pages,
+        "rows": rows,
+        "pages_per_sec": round(pages / elapsed, 1),
+        "rows_per_sec": round(rows / elapsed, 1),
+        "bytes": size,
+        "peak_memory_kib": peak // 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against local HTML fixtures.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark; the fastest is reported.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this text.")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    adapter = FixtureAdapter()
+    http_client.set_transport(adapter)
+    http_client.set_cache(None)
+    http_client.set_rate_limiter(RateLimiter({"duelmasters.fandom.com": 1e9, "yuyu-tei.jp": 1e9}, 1e9))
+    data_scraper.set_card_index(None)
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # Generated CSVs, journals and set_lists.json stay out of the repository
+        os.chdir(workdir)
+        try:
+            for name, func in BENCHMARKS:
+                if args.only and args.only not in name:
+                    continue
+                results[name] = run_benchmark(adapter, func, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    print(f"{'benchmark':<38}{'seconds':>9}{'pages/s':>10}{'rows/s':>10}{'peak KiB':>10}")
+    for name, result in results.items():
+        print(f"{name:<38}{result['seconds']:>9.3f}{result['pages_per_sec']:>10.1f}"
+              f"{result['rows_per_sec']:>10.1f}{result['peak_memory_kib']:>10}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
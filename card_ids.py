@@ -0,0 +1,32 @@
+import re
+from functools import lru_cache
+
+# Character fixes done in a single str.translate pass:
+# fullwidth ASCII (yuyu-tei writes e.g. "ｂ") becomes ASCII, ☆ and variation selectors
+# are dropped and ㊙ is spelled out as yuyu-tei does
+_TRANSLATION = str.maketrans({
+    **{chr(codepoint): chr(codepoint - 0xFEE0) for codepoint in range(0xFF01, 0xFF5F)},
+    **{chr(codepoint): None for codepoint in range(0xFE00, 0xFE10)},
+    "☆": None,
+    "㊙": "(秘)",
+})
+# Multi-character fixes: "Ultra " is yuyu-tei's spelling of 超, a zero typed for the O of OR
+_REPLACEMENTS = re.compile(r"Ultra |0R")
+_REPLACEMENT_TEXT = {"Ultra ": "超", "0R": "OR"}
+# "超GR1/超R2" -> "超GR1/超GR2": the number after the slash of a 超G id keeps its G
+_MISSING_G = re.compile(r"^(超G[^超]*超)(?!G)")
+# yuyu-tei lists the ids of a card sharing one price separated by fullwidth bars
+YUYUTEI_ID_SEPARATOR = "｜"
+
+
+@lru_cache(maxsize=65536)
+def normalize_card_id(card_id):
+    """Canonical form of a card id from fandom or yuyu-tei, so the two match by equality."""
+    card_id = card_id.strip().translate(_TRANSLATION)
+    card_id = _REPLACEMENTS.sub(lambda match: _REPLACEMENT_TEXT[match.group()], card_id)
+    return _MISSING_G.sub(r"\1G", card_id, count=1)
+
+
+def split_yuyutei_ids(text):
+    """Normalized card ids of one yuyu-tei listing, e.g. "超GR1/超GR2｜Ultra GR1/Ultra GR2"."""
+    return {normalize_card_id(card_id) for card_id in text.split(YUYUTEI_ID_SEPARATOR)}
@@ -0,0 +1,98 @@
+import csv
+import glob
+import json
+import os
+import threading
+from urllib.parse import unquote, urlsplit
+
+CARD_INDEX_FILENAME = "card_index.json"
+HISTORICAL_CSV_DIR = "historical_csv"
+
+# Results that describe a failed fetch rather than the card, so they are never stored
+TRANSIENT_RESULTS = {"Error", "Failed to retrieve"}
+
+
+def normalize_reference_url(url):
+    """Canonical form of a fandom card URL, so quoting and scheme differences share one key."""
+    parts = urlsplit(url.strip())
+    path = unquote(parts.path).replace(" ", "_").rstrip("/")
+    return f"{parts.netloc.lower()}{path}"
+
+
+class CardIndex:
+    """Persistent map of normalized reference URL -> (civilization, japanese_name)."""
+
+    def __init__(self, path=CARD_INDEX_FILENAME):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._cards = {}
+        self._added = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._cards = {key: tuple(value) for key, value in json.load(f).items()}
+
+    def __len__(self):
+        return len(self._cards)
+
+    def get(self, reference_url):
+        key = normalize_reference_url(reference_url)
+        with self._lock:
+            value = self._cards.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def add(self, reference_url, civilization, japanese_name, overwrite=True):
+        if civilization in TRANSIENT_RESULTS or japanese_name in TRANSIENT_RESULTS:
+            return
+        key = normalize_reference_url(reference_url)
+        with self._lock:
+            if overwrite or key not in self._cards:
+                self._cards[key] = self._added[key] = (civilization, japanese_name)
+
+    def resolve(self, reference_url, fetch):
+        """Return the cached metadata for reference_url, calling fetch(reference_url) on a miss."""
+        value = self.get(reference_url)
+        if value is None:
+            value = fetch(reference_url)
+            self.add(reference_url, *value)
+        return value
+
+    def seed_from_csv_dir(self, directory=HISTORICAL_CSV_DIR):
+        """Fill in cards missing from the index from previously generated set CSVs."""
+        before = len(self._cards)
+        for csv_filename in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+            with open(csv_filename, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    reference = row.get("Reference", "")
+                    if reference.startswith("http"):
+                        self.add(reference, row["Civilization"], row["Japanese Name"], overwrite=False)
+        return len(self._cards) - before
+
+    def take_added(self):
+        """Cards stored since the index was loaded or last asked, keyed by normalized URL."""
+        with self._lock:
+            added, self._added = self._added, {}
+            return added
+
+    def merge(self, cards):
+        """Add cards returned by take_added() of another index, e.g. one in a worker process."""
+        with self._lock:
+            for key, value in cards.items():
+                self._cards[key] = tuple(value)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def save(self):
+        with self._lock:
+            data = {key: list(value) for key, value in self._cards.items()}
+        tmp_filename = f"{self.path}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_filename, self.path)
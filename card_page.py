@@ -0,0 +1,166 @@
+import re
+from html.parser import HTMLParser
+
+# Start of the first infobox; everything before it (site navigation) is never parsed
+_INFOBOX_START = re.compile(r"""<table\b[^>]*\bclass\s*=\s*["']?[^"'>]*\bwikitable\b""", re.IGNORECASE)
+# Infobox row labels and the field each fills; the first label contained in a row's first cell wins
+INFOBOX_FIELDS = [
+    ("Civilization", "civilization"),
+    ("Card Type", "card_type"),
+    ("Mana Cost", "cost"),
+    ("Race", "race"),
+    ("Power", "power"),
+    ("Mana Number", "mana_number"),
+]
+CIVILIZATION_NOT_FOUND = "Civilization Not Found"
+JAPANESE_NAME_NOT_FOUND = "Japanese Name Not Found"
+# Elements without an end tag
+_VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _Done(Exception):
+    pass
+
+
+class _InfoboxParser(HTMLParser):
+    """Event-driven reader of the wikitable infoboxes of a card page.
+
+    Each infobox becomes a dict holding japanese_name (from the <small> of its
+    first row: direct text plus the <rb> of <ruby> readings, leaving out <rt>)
+    and the INFOBOX_FIELDS found in its two-cell rows, with cell text joined
+    like get_text(strip=True). Parsing stops by raising _Done as soon as
+    nothing more is wanted, or at the first <h2> after an infobox.
+    """
+
+    def __init__(self, fields, max_tables):
+        super().__init__(convert_charrefs=True)
+        self.fields = fields
+        self.max_tables = max_tables
+        self.infoboxes = []
+        self._infobox = None
+        self._depth = 0
+        self._rows = 0
+        self._row = None
+        self._cell = None
+        # Open elements inside the Japanese name's <small>, None when not inside it
+        self._small = None
+        self._name_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            if self._depth:
+                self._depth += 1
+            elif "wikitable" in (dict(attrs).get("class") or "").split():
+                self._infobox = {}
+                self._depth = 1
+                self._rows = 0
+            return
+        if not self._depth:
+            # The infoboxes (both halves of a twinpact) come before the first section heading
+            if tag == "h2" and self.infoboxes:
+                raise _Done
+            return
+        if self._small is not None:
+            if tag not in _VOID_ELEMENTS:
+                self._small.append(tag)
+        elif self._depth == 1 and tag == "tr":
+            self._end_row()
+            self._rows += 1
+            self._row = []
+        elif self._depth == 1 and tag == "td" and self._row is not None:
+            self._end_cell()
+            self._cell = []
+        elif tag == "small" and self._rows == 1 and "japanese_name" not in self._infobox:
+            self._small = []
+            self._name_parts = []
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        if self._small is not None:
+            if tag == "small" and not self._small:
+                self._small = None
+                self._found("japanese_name", "".join(self._name_parts).strip())
+            elif tag in self._small:
+                # Also closes elements whose end tag is missing
+                del self._small[len(self._small) - 1 - self._small[::-1].index(tag):]
+        elif tag == "table":
+            self._depth -= 1
+            if not self._depth:
+                self._end_row()
+                self._end_infobox()
+        elif self._depth == 1 and tag == "td":
+            self._end_cell()
+        elif self._depth == 1 and tag == "tr":
+            self._end_row()
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data.strip())
+        if self._small is not None and (not self._small or (self._small[0] == "ruby" and "rb" in self._small)):
+            self._name_parts.append(data.strip())
+
+    def _end_cell(self):
+        if self._cell is not None:
+            self._row.append("".join(self._cell))
+            self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        row, self._row = self._row, None
+        if row and len(row) > 1:
+            for label, field in INFOBOX_FIELDS:
+                if label in row[0]:
+                    self._found(field, row[1])
+                    break
+
+    def _found(self, field, value):
+        self._infobox[field] = value
+        # A single infobox is done once every wanted field is known
+        if self.max_tables == 1 and self.fields and all(name in self._infobox for name in self.fields):
+            self._end_infobox()
+
+    def _end_infobox(self):
+        self.infoboxes.append(self._infobox)
+        self._infobox = None
+        self._depth = 0
+        if self.max_tables and len(self.infoboxes) >= self.max_tables:
+            raise _Done
+
+
+def parse_infoboxes(html, fields=None, max_tables=None):
+    """One dict per wikitable infobox of a card page, in page order (two for a twinpact).
+
+    fields lists the keys the caller needs; with max_tables=1 parsing stops
+    as soon as they are all found.
+    """
+    start = _INFOBOX_START.search(html)
+    if start is None:
+        return []
+    parser = _InfoboxParser(fields, max_tables)
+    try:
+        parser.feed(html[start.start():])
+        parser.close()
+    except _Done:
+        pass
+    return parser.infoboxes
+
+
+def normalize_civilization(civilization):
+    if not civilization:
+        return CIVILIZATION_NOT_FOUND
+    if "colorless" in civilization.lower() or "colourless" in civilization.lower():
+        return "Colourless"
+    return civilization
+
+
+def extract_card_details(html):
+    """Every infobox field of a card, from the first infobox; a twinpact's other sides are under "sides"."""
+    infoboxes = parse_infoboxes(html)
+    if not infoboxes:
+        return {"civilization": CIVILIZATION_NOT_FOUND, "japanese_name": JAPANESE_NAME_NOT_FOUND, "sides": []}
+    details = dict(infoboxes[0])
+    details["civilization"] = normalize_civilization(details.get("civilization"))
+    details["japanese_name"] = details.get("japanese_name") or JAPANESE_NAME_NOT_FOUND
+    details["sides"] = infoboxes[1:]
+    return details
@@ -0,0 +1,211 @@
+import argparse
+import csv
+import glob
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+from card_index import HISTORICAL_CSV_DIR
+
+CATALOG_DB_FILENAME = "catalog.sqlite3"
+GENERATED_CSV_DIR = "generated_csv"
+# A set found in several directories is read from the last one, so fresh scrapes win
+SOURCE_DIRS = (HISTORICAL_CSV_DIR, GENERATED_CSV_DIR)
+# Files in the source directories that are not the CSV of a single set
+NON_SET_FILES = {"catalog.csv"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    set_key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    no INTEGER,
+    rarity TEXT,
+    japanese_name TEXT,
+    english_name TEXT,
+    civilization TEXT,
+    reference TEXT,
+    price_yen INTEGER,
+    price_sgd REAL,
+    qty INTEGER,
+    PRIMARY KEY (set_key, id)
+);
+CREATE INDEX IF NOT EXISTS cards_japanese_name ON cards (japanese_name);
+CREATE INDEX IF NOT EXISTS cards_civilization ON cards (civilization);
+CREATE INDEX IF NOT EXISTS cards_rarity_price ON cards (rarity, price_yen);
+-- Multicolour cards ("Water/Fire/Nature") have one row per civilization here
+CREATE TABLE IF NOT EXISTS card_civilizations (
+    civilization TEXT NOT NULL,
+    set_key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (civilization, set_key, id)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    set_key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    loaded_at REAL NOT NULL
+);
+"""
+
+COLUMNS = ("set_key", "id", "no", "rarity", "japanese_name", "english_name", "civilization",
+           "reference", "price_yen", "price_sgd", "qty")
+
+
+def find_set_csvs(directories=SOURCE_DIRS):
+    """{set key: CSV path} for every per-set CSV in the given directories."""
+    sources = {}
+    for directory in directories:
+        for csv_filename in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+            if os.path.basename(csv_filename) not in NON_SET_FILES:
+                sources[os.path.splitext(os.path.basename(csv_filename))[0]] = csv_filename
+    return sources
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _number(text, kind=int):
+    try:
+        return kind(float(text))
+    except (TypeError, ValueError):
+        return None
+
+
+# Turn one row of a set CSV (see data_scraper.CSV_HEADER) into the columns of the cards table
+def catalog_row(set_key, row):
+    return (set_key, row["Id"], _number(row["No"]), row["Rarity"], row["Japanese Name"], row["English Name"],
+            row["Civilization"], row["Reference"], _number(row["Price (Yen)"]), _number(row["Price (SGD)"], float),
+            _number(row["Qty"]))
+
+
+class Catalog:
+    """All per-set CSVs in one SQLite database, keyed by (set, card id).
+
+    build() only re-reads sets whose CSV changed since the last build, and
+    replaces the rows of each of them in a single transaction.
+    """
+
+    def __init__(self, path=CATALOG_DB_FILENAME):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+
+    def build(self, directories=SOURCE_DIRS):
+        """Load new and changed sets and drop sets whose CSV is gone. Returns (updated, unchanged, removed) keys."""
+        sources = find_set_csvs(directories)
+        known = {row["set_key"]: row["digest"] for row in self._conn.execute("SELECT set_key, digest FROM sources")}
+
+        updated, unchanged = [], []
+        for set_key, csv_filename in sources.items():
+            digest = file_digest(csv_filename)
+            if known.get(set_key) == digest:
+                unchanged.append(set_key)
+                continue
+            with open(csv_filename, "r", newline="", encoding="utf-8") as f:
+                rows = [catalog_row(set_key, row) for row in csv.DictReader(f)]
+            self.upsert_set(set_key, rows, csv_filename, digest)
+            updated.append(set_key)
+
+        removed = sorted(set(known) - set(sources))
+        for set_key in removed:
+            self.remove_set(set_key)
+        return updated, unchanged, removed
+
+    def upsert_set(self, set_key, rows, path="", digest=""):
+        with self._conn:
+            old_ids = {row["id"] for row in self._conn.execute("SELECT id FROM cards WHERE set_key = ?", (set_key,))}
+            self._conn.executemany(
+                f"INSERT INTO cards ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                f"ON CONFLICT (set_key, id) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[2:]),
+                rows)
+            # Cards that are no longer listed in the set
+            self._conn.executemany("DELETE FROM cards WHERE set_key = ? AND id = ?",
+                                   [(set_key, card_id) for card_id in old_ids - {row[1] for row in rows}])
+
+            self._conn.execute("DELETE FROM card_civilizations WHERE set_key = ?", (set_key,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO card_civilizations (civilization, set_key, id) VALUES (?, ?, ?)",
+                [(civilization.strip(), set_key, row[1]) for row in rows for civilization in (row[6] or "").split("/")
+                 if civilization.strip()])
+            self._conn.execute("INSERT OR REPLACE INTO sources (set_key, path, digest, loaded_at) VALUES (?, ?, ?, ?)",
+                               (set_key, path, digest, time.time()))
+
+    def remove_set(self, set_key):
+        with self._conn:
+            for table in ("cards", "card_civilizations", "sources"):
+                self._conn.execute(f"DELETE FROM {table} WHERE set_key = ?", (set_key,))
+
+    def find(self, civilization=None, rarity=None, japanese_name=None, set_key=None, min_price=None, max_price=None):
+        """Cards matching every given filter, most expensive first.
+
+        civilization matches any colour of a multicolour card, japanese_name is a substring match.
+        """
+        clauses, params = [], []
+        if civilization:
+            clauses.append("EXISTS (SELECT 1 FROM card_civilizations c WHERE c.civilization = ?"
+                           " AND c.set_key = cards.set_key AND c.id = cards.id)")
+            params.append(civilization)
+        if rarity:
+            clauses.append("rarity = ?")
+            params.append(rarity)
+        if japanese_name:
+            clauses.append("japanese_name LIKE ?")
+            params.append(f"%{japanese_name}%")
+        if set_key:
+            clauses.append("set_key = ?")
+            params.append(set_key)
+        if min_price is not None:
+            clauses.append("price_yen >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price_yen <= ?")
+            params.append(max_price)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT * FROM cards{where} ORDER BY price_yen DESC, set_key, no"
+        return [dict(row) for row in self._conn.execute(query, params)]
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the SQLite catalog of every per-set CSV.")
+    parser.add_argument("--db", default=CATALOG_DB_FILENAME, help="Path of the catalog database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Load new and changed set CSVs into the catalog.")
+    build_parser.add_argument("directories", nargs="*", default=list(SOURCE_DIRS),
+                              help="Directories of set CSVs; later ones win for the same set.")
+
+    query_parser = subparsers.add_parser("query", help="Print the cards matching the given filters as CSV.")
+    query_parser.add_argument("--civilization")
+    query_parser.add_argument("--rarity")
+    query_parser.add_argument("--name", help="Part of the Japanese name.")
+    query_parser.add_argument("--set", dest="set_key")
+    query_parser.add_argument("--min-price", type=int, help="Minimum price in yen.")
+    query_parser.add_argument("--max-price", type=int, help="Maximum price in yen.")
+    args = parser.parse_args()
+
+    catalog = Catalog(args.db)
+    start_time = time.time()
+    if args.command == "build":
+        updated, unchanged, removed = catalog.build(args.directories)
+        print(f"{len(updated)} sets loaded, {len(unchanged)} unchanged, {len(removed)} removed; "
+              f"{len(catalog)} cards in {args.db}.")
+    else:
+        cards = catalog.find(args.civilization, args.rarity, args.name, args.set_key, args.min_price, args.max_price)
+        writer = csv.writer(sys.stdout)
+        writer.writerow(COLUMNS)
+        writer.writerows([card[column] for column in COLUMNS] for card in cards)
+        print(f"{len(cards)} cards.", file=sys.stderr)
+    catalog.close()
+    print(f"Time taken: {time.time() - start_time:.2f} seconds", file=sys.stderr)
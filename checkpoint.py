@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+CHECKPOINT_DIR = "checkpoints"
+CRAWL_STATE_FILENAME = "crawl_state.json"
+
+
+class RowJournal:
+    """Append-only record of the rows of one set that are already resolved.
+
+    Each line holds the row number, its reference URL and card id, so a resumed
+    run only reuses a row if the set page still lists the same card there.
+    """
+
+    def __init__(self, key, directory=CHECKPOINT_DIR, resume=False):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{key}.jsonl")
+        self._lock = threading.Lock()
+        self._done = {}
+        if resume and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be cut short by a crash
+                        continue
+                    self._done[record["no"]] = record
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+
+    def completed_row(self, no, reference, card_id):
+        """The finished row stored for this position, or None if it has to be resolved."""
+        record = self._done.get(no)
+        if record and record["reference"] == reference and record["id"] == card_id:
+            return tuple(record["row"])
+        return None
+
+    def record(self, no, row):
+        line = json.dumps({"no": no, "reference": row[4], "id": row[3], "row": list(row)}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        """Drop the journal once the set's CSV is written and nothing is left to resume."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def resumed_rows(self):
+        return len(self._done)
+
+
+# MediaWiki embeds the revision of the page in its JS config
+_REVISION_RE = re.compile(r'"wgRevisionId":\s*(\d+)')
+
+
+def page_signature(html, contents_html=""):
+    """Identify a version of a fandom set page, by revision id or by a hash of its Contents section."""
+    match = _REVISION_RE.search(html)
+    if match:
+        return f"rev:{match.group(1)}"
+    return "sha256:" + hashlib.sha256(contents_html.encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    """Page signature of every set at the time its CSV was last written.
+
+    With autosave=False updates are only kept in memory (see updates()), which
+    lets worker processes hand them back instead of racing on the file.
+    """
+
+    def __init__(self, path=CRAWL_STATE_FILENAME, autosave=True):
+        self.path = path
+        self.autosave = autosave
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._updates = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._signatures = json.load(f)
+
+    def is_unchanged(self, key, signature):
+        return self._signatures.get(key) == signature
+
+    def updates(self):
+        with self._lock:
+            return dict(self._updates)
+
+    def update(self, key, signature):
+        with self._lock:
+            self._signatures[key] = self._updates[key] = signature
+            data = dict(self._signatures)
+        if self.autosave:
+            self._save(data)
+
+    def _save(self, data):
+        tmp_filename = f"{self.path}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_filename, self.path)
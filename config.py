@@ -0,0 +1,40 @@
+import copy
+import json
+import os
+
+ERAS_FILENAME = "set_eras.json"
+SET_LISTS_FILENAME = "set_lists.json"
+
+# path -> ((mtime_ns, size), parsed contents) of every config file read so far
+_loaded = {}
+
+
+# Load a JSON file, returning None (after printing why) if it is missing or invalid.
+# The file is parsed once and served from memory until it changes on disk; callers get
+# their own copy, so a long-running process can modify it without touching the cache.
+def load_json(json_file):
+    try:
+        stat = os.stat(json_file)
+    except FileNotFoundError:
+        print(f"Error: The file {json_file} was not found.")
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded.get(json_file)
+    if cached is None or cached[0] != version:
+        try:
+            with open(json_file, "r") as f:
+                cached = _loaded[json_file] = (version, json.load(f))
+        except json.JSONDecodeError:
+            print(f"Error: The file {json_file} is not a valid JSON file.")
+            return None
+    return copy.copy(cached[1])
+
+
+# {era key: era URL} from set_eras.json
+def set_eras():
+    return load_json(ERAS_FILENAME)
+
+
+# {set key: set URL} from set_lists.json
+def set_lists():
+    return load_json(SET_LISTS_FILENAME)
@@ -0,0 +1,161 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import data_scraper
+import http_client
+import metrics
+from checkpoint import page_signature
+
+
+class SetPlan:
+    """The rows of one set page, as (english_name, item_link, rarity, card_id) in page order."""
+
+    def __init__(self, key, url, rows, signature):
+        self.key = key
+        self.url = url
+        self.rows = rows
+        self.signature = signature
+
+
+# Fetch and parse one set page; None (after printing why) when it has nothing to scrape
+def load_set_plan(key, url, crawl_state=None, incremental=False):
+    try:
+        return _load_set_plan(key, url, crawl_state, incremental)
+    except Exception as e:
+        print(f"[{key}] Scraping failed: {e}")
+        return None
+
+
+def _load_set_plan(key, url, crawl_state, incremental):
+    with metrics.set_scope(key):
+        response = http_client.get(url, revalidate=incremental)
+        if response.status_code != 200:
+            print(f"[{key}] Failed to fetch the webpage. Status code: {response.status_code}")
+            return None
+        h2 = data_scraper.parse_set_page(response.text)
+        if h2 is None:
+            print(f"[{key}] Contents section not found.")
+            return None
+        signature = page_signature(response.text, data_scraper.section_html(h2))
+        if incremental and crawl_state and crawl_state.is_unchanged(key, signature) \
+                and os.path.exists(data_scraper.set_csv_filename(key)):
+            print(f"[{key}] has not changed since the last run, skipping.")
+            return None
+        rows = [(english_name, item_link, rarity, card_id)
+                for english_name, item_link, printings in data_scraper.parse_contents_section(h2, url)
+                for rarity, card_id in printings]
+    if not rows:
+        print(f"[{key}] No items found in the Contents section.")
+        return None
+    return SetPlan(key, url, rows, signature)
+
+
+# The yuyu-tei listing prices of a set; a set whose listing fails is priced through searches alone
+def load_set_prices(key):
+    with metrics.set_scope(key):
+        try:
+            return data_scraper.fetch_set_price_map(key)
+        except Exception as e:
+            print(f"[{key}] yuyu-tei listing failed: {e}")
+            return {}
+
+
+# Call func(*args), handing back the exception instead of raising it
+def _attempt(func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+
+class CrawlPlan:
+    """Every selected set parsed up front, with the work they share deduplicated.
+
+    A card page is fetched once however many sets list it, and a price is
+    looked up once per (Japanese name, card id), all through one PriceResolver
+    so each yuyu-tei search term is requested once for the whole run. A
+    failed card page or price only fails the sets that list it.
+    """
+
+    def __init__(self, set_plans, set_prices=None):
+        self.set_plans = set_plans
+        # Per set {card id: price} from the yuyu-tei set listings, when used
+        self.set_prices = set_prices or {}
+        self.links = list(dict.fromkeys(item_link for plan in set_plans for _, item_link, _, _ in plan.rows))
+        self.appearances = sum(len(plan.rows) for plan in set_plans)
+        self.metadata = {}
+        self.prices = {}
+
+    def resolve_metadata(self, executor):
+        metadata = executor.map(lambda link: _attempt(data_scraper.get_card_metadata, link), self.links)
+        self.metadata = dict(zip(self.links, metadata))
+
+    def price_queries(self):
+        """Unique (Japanese name, card id) pairs whose price is not already known from a set listing."""
+        queries = {}
+        for plan in self.set_plans:
+            set_prices = self.set_prices.get(plan.key, {})
+            for _, item_link, _, card_id in plan.rows:
+                metadata = self.metadata[item_link]
+                if card_id not in set_prices and not isinstance(metadata, Exception):
+                    queries[(metadata[1], card_id)] = None
+        return list(queries)
+
+    def resolve_prices(self, executor):
+        queries = self.price_queries()
+        resolver = data_scraper.PriceResolver()
+        prices = executor.map(lambda query: _attempt(resolver.get_price, *query), queries)
+        self.prices = dict(zip(queries, prices))
+        return resolver
+
+    def set_rows(self, plan):
+        """Complete rows of a set, in the order data_scraper.write_set_rows expects."""
+        set_prices = self.set_prices.get(plan.key, {})
+        for english_name, item_link, rarity, card_id in plan.rows:
+            metadata = self.metadata[item_link]
+            if isinstance(metadata, Exception):
+                raise metadata
+            civilization, japanese_name = metadata
+            price = set_prices[card_id] if card_id in set_prices else self.prices[(japanese_name, card_id)]
+            if isinstance(price, Exception):
+                raise price
+            yield english_name, japanese_name, rarity, card_id, item_link, civilization, price
+
+
+def run(sets, workers=http_client.DEFAULT_WORKERS, use_set_listing=False, crawl_state=None,
+        incremental=False, jsonl=True):
+    """Plan, resolve and write every {key: url} in sets and return {key: csv_filename or None}."""
+    start_time = time.time()
+    results = dict.fromkeys(sets)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        set_plans = [plan for plan in executor.map(
+            lambda item: load_set_plan(item[0], item[1], crawl_state, incremental), sets.items()) if plan]
+        set_prices = {}
+        if use_set_listing:
+            keys = [plan.key for plan in set_plans]
+            set_prices = dict(zip(keys, executor.map(load_set_prices, keys)))
+
+        crawl_plan = CrawlPlan(set_plans, set_prices)
+        crawl_plan.resolve_metadata(executor)
+        queries = len(crawl_plan.price_queries())
+        resolver = crawl_plan.resolve_prices(executor)
+    print(f"Planned {crawl_plan.appearances} rows in {len(set_plans)} sets: {len(crawl_plan.links)} unique cards, "
+          f"{queries} unique prices from {resolver.searches} searches and {resolver.fallbacks} single-card lookups.")
+
+    for plan in set_plans:
+        with metrics.set_scope(plan.key):
+            try:
+                row_count = data_scraper.write_set_rows(plan.key, crawl_plan.set_rows(plan), jsonl)
+            except Exception as e:
+                # The row writer drops the partial files, the previous CSV stays in place
+                print(f"[{plan.key}] Scraping failed: {e}")
+                continue
+        if row_count:
+            results[plan.key] = data_scraper.set_csv_filename(plan.key)
+            if crawl_state:
+                crawl_state.update(plan.key, plan.signature)
+            print(f"[{plan.key}] Contents saved to {results[plan.key]}")
+    print(f"Scraped {sum(1 for csv_filename in results.values() if csv_filename)} of {len(sets)} sets "
+          f"in {time.time() - start_time:.2f} seconds.")
+    return results
@@ -1,83 +1,72 @@
 import re
-import requests
-from bs4 import BeautifulSoup
 import csv
-import json
 import time
 import sys
 from urllib.parse import urljoin
 import os  # To ensure the folder exists
-
-RATE = 0.0087
-SET_LISTS_FILENAME="set_lists.json"
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
+
+import http_client
+import metrics
+import http_cache
+import rate_limiter
+import config
+from card_ids import normalize_card_id, split_yuyutei_ids
+from card_index import CardIndex, CARD_INDEX_FILENAME, HISTORICAL_CSV_DIR
+from card_page import CIVILIZATION_NOT_FOUND, JAPANESE_NAME_NOT_FOUND, normalize_civilization, parse_infoboxes
+from checkpoint import CrawlState, RowJournal, CRAWL_STATE_FILENAME, page_signature
+from row_writer import CsvSink, JsonLinesSink, RowWriter
+from price_history import PriceHistory, PRICE_HISTORY_FILENAME, timestamp
+from pricing import RateTable, convert_price
+
+SET_LISTS_FILENAME = config.SET_LISTS_FILENAME
+YUYUTEI_SEARCH_URL = "https://yuyu-tei.jp/sell/dm/s/search?search_word="
+YUYUTEI_SET_URL = "https://yuyu-tei.jp/sell/dm/s/"
+# Shared card metadata index, consulted before fetching a card page (see set_card_index)
+_card_index = None
+CATALOG_FILENAME = "./generated_csv/catalog.csv"
+# yuyu-tei requests (searches and single-card lookups) allowed per price refresh run
+REFRESH_BUDGET = 100
+CSV_HEADER = ["No", "Rarity", "Id", "Japanese Name", "English Name", "Civilization", "Set", "Reference", "Price (Yen)", "Price (SGD)", "Qty"]
+
+# Extract Civilization and Japanese Name from the HTML of a card reference page.
+# Only the first infobox is read, and parsing stops once both fields are found.
+@metrics.timed("metadata")
+def extract_civilization_and_japanese_name(html):
+    infoboxes = parse_infoboxes(html, fields=("civilization", "japanese_name"), max_tables=1)
+    if not infoboxes:
+        return CIVILIZATION_NOT_FOUND, JAPANESE_NAME_NOT_FOUND
+    return normalize_civilization(infoboxes[0].get("civilization")), infoboxes[0].get("japanese_name") or JAPANESE_NAME_NOT_FOUND
 
 # Function to extract Civilization from the reference page
 def get_civilization_and_japanese_name(reference_url):
     try:
         # Send a GET request to the reference URL
-        response = requests.get(reference_url)
+        response = http_client.get(reference_url)
         
         # Check if the request was successful
         if response.status_code == 200:
-            # Parse the HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for tables with class 'wikitable'
-            tables = soup.find_all('table', {'class': 'wikitable'})
-            for table in tables:
-                # Look at the first <tr> to find the Japanese Name in <small>
-                first_row = table.find('tr')
-                civilization = None
-                japanese_name = None
-
-                if first_row:
-                    # Check for the <small> tag inside the first <tr>
-                    small_tag = first_row.find('small')
-                    if small_tag:
-                        # Initialize a list to hold the ordered text parts
-                        ordered_text = []
-
-                        # Step 1: Split the <small> contents into text and <ruby> parts
-                        contents = small_tag.contents
-
-                        for content in contents:
-                            if isinstance(content, str):  # This is text
-                                ordered_text.append(content.strip())
-                            elif content.name == 'ruby':  # This is a <ruby> tag
-                                # Extract the text from <rb> inside the <ruby> tag
-                                rb_tags = content.find_all('rb')
-                                for rb in rb_tags:
-                                    ordered_text.append(rb.get_text(strip=True))
-
-                        # Join all parts into the final Japanese name
-                        japanese_name = ''.join(ordered_text).strip()
-
-                # Extract Civilization from the other rows
-                rows = table.find_all('tr')
-                for row in rows:
-                    td = row.find_all('td')
-                    if len(td) > 1:
-                        # Extract Civilization text
-                        if 'Civilization' in td[0].get_text(strip=True):
-                            civilization = td[1].get_text(strip=True)
-
-                if "colorless" in civilization.lower() or "colourless" in civilization.lower():
-                    civilization = "Colourless"
-
-                # If no civilization is found, return a default message
-                if not civilization:
-                    civilization = "Civilization Not Found"
-                if not japanese_name:
-                    japanese_name = "Japanese Name Not Found"
-                
-                return civilization, japanese_name
-            return "Civilization Not Found", "Japanese Name Not Found"
+            return extract_civilization_and_japanese_name(response.text)
         else:
             return "Failed to retrieve", "Failed to retrieve"
     except Exception as e:
         print(f"Error fetching Civilization and Japanese Name: {e}")
         return "Error", "Error"
     
+def set_card_index(index):
+    global _card_index
+    _card_index = index
+
+# Card metadata from the card index when known, otherwise from the reference page
+def get_card_metadata(reference_url):
+    if _card_index is None:
+        return get_civilization_and_japanese_name(reference_url)
+    return _card_index.resolve(reference_url, get_civilization_and_japanese_name)
+
 def is_japanese_char(char):
     """Check if a character is Japanese."""
     codepoint = ord(char)
@@ -113,26 +102,35 @@ def find_consecutive_japanese(text):
     print(f"Failed to sanitize name for price search, falling back to {text}")
     return text
 
-# Function to extract price from yuyutei
-def fetch_highest_price(jap_name: str, card_id: str) -> int:
-    base_url = "https://yuyu-tei.jp/sell/dm/s/search?search_word="
-    complete_url = f"{base_url}{find_consecutive_japanese(jap_name)}%20{card_id}"
+# Build the yuyu-tei search URL for a card; callers that already know the search term pass it
+def build_price_search_url(jap_name: str, card_id: str, search_term: str = None) -> str:
+    return f"{YUYUTEI_SEARCH_URL}{search_term or find_consecutive_japanese(jap_name)}%20{card_id}"
 
-    # Fetch the webpage
-    response = requests.get(complete_url)
-    
-    # Check if the request was successful
+# Fetch one yuyu-tei search for a name prefix and map all listed card ids to their highest price
+def fetch_price_map(search_term: str, revalidate: bool = False) -> dict:
+    complete_url = f"{YUYUTEI_SEARCH_URL}{search_term}"
+    try:
+        response = http_client.get(complete_url, revalidate)
+    except http_client.OfflineCacheMiss:
+        return {}
     if response.status_code != 200:
         raise Exception(f"Failed to fetch URL: {complete_url}, status code: {response.status_code}")
-    
-    # Parse the HTML content
-    soup = BeautifulSoup(response.text, 'html.parser')
+    return extract_price_map(response.text)
+
+# Map every card id listed on a yuyu-tei search page to its highest price
+@metrics.timed("price")
+def extract_price_map(html: str) -> dict:
+    # bs4 is only imported once a page has to be parsed
+    from html_parsing import PRICE_LIST_ONLY, make_soup
+
+    # Parse only the <div id="card-list3"> blocks of the page
+    soup = make_soup(html, PRICE_LIST_ONLY)
     
     # Find all <div> elements with id="class-list3"
     class_list3_divs = soup.find_all('div', id="card-list3")
     
-    # Initialize a list to store prices
-    prices = []
+    # Initialize a dict to store the highest price of each card id
+    prices = {}
     
     for div in class_list3_divs:
         # Find all <div> elements with class="col-md" within the current <div>
@@ -142,173 +140,512 @@ def fetch_highest_price(jap_name: str, card_id: str) -> int:
             # Look for <span> with the specified class
             card_id_span = col_md.find('span', class_="d-block border border-dark p-1 w-100 text-center my-2")
             if card_id_span:
-                # Sanitize page data
-                card_id_parts = card_id_span.get_text(strip=True).split("｜")
-                for no, id in enumerate(card_id_parts):
-                    card_id_parts[no]=id.replace("ｂ", "b")
-                    card_id_parts[no]=id.replace("Ultra ","超")
-
-                if card_id in card_id_parts:
-                    # Look for <strong> with the specified class
-                    price_strong = col_md.find('strong', class_="d-block text-end") or col_md.find('strong', class_="d-block text-end text-danger")
-                    if price_strong:
-                        # Extract, clean, and convert the price text to an integer
-                        price_text = price_strong.get_text(strip=True).replace(",", "").replace("円", "")
-                        try:
-                            prices.append(int(price_text))
-                        except ValueError:
-                            # Skip invalid prices
-                            continue
+                # Ids in the same canonical form as the ones taken from fandom
+                card_ids = split_yuyutei_ids(card_id_span.get_text(strip=True))
+
+                # Look for <strong> with the specified class
+                price_strong = col_md.find('strong', class_="d-block text-end") or col_md.find('strong', class_="d-block text-end text-danger")
+                if price_strong:
+                    # Extract, clean, and convert the price text to an integer
+                    price_text = price_strong.get_text(strip=True).replace(",", "").replace("円", "")
+                    try:
+                        price = int(price_text)
+                    except ValueError:
+                        # Skip invalid prices
+                        continue
+                    for id in card_ids:
+                        prices[id] = max(price, prices.get(id, price))
     
-    # Return the highest price in the list, or 0 if no prices found
-    return max(prices, default=-1)
+    return prices
+
+# Extract the highest price listed for card_id from a yuyu-tei search page
+def extract_highest_price(html: str, card_id: str) -> int:
+    # Return the highest price for the card, or -1 if no prices found
+    return extract_price_map(html).get(normalize_card_id(card_id), -1)
+
+# yuyu-tei names its set listings after the set code, e.g. DM24-RP1 -> dm24rp1
+def yuyutei_set_code(key: str) -> str:
+    return re.sub(r'[^0-9a-z]', '', key.lower())
+
+# Highest page number linked from the pagination of a yuyu-tei listing page.
+# Only the pagination element counts, other paginated links on the page are ignored.
+def extract_listing_page_count(html: str) -> int:
+    from html_parsing import PAGINATION_ONLY, make_soup
+
+    pages = [int(match.group(1)) for a_tag in make_soup(html, PAGINATION_ONLY).find_all("a", href=True)
+             for match in [re.search(r'[?&]page=(\d+)', a_tag["href"])] if match]
+    return max(pages, default=1)
+
+# Fetch every page of the yuyu-tei listing for a set and map all its card ids to their highest price
+def fetch_set_price_map(key: str) -> dict:
+    set_url = f"{YUYUTEI_SET_URL}{yuyutei_set_code(key)}"
+    prices = {}
+    page = 1
+    page_count = 1
+    while page <= page_count:
+        page_url = set_url if page == 1 else f"{set_url}?page={page}"
+        try:
+            response = http_client.get(page_url)
+        except http_client.OfflineCacheMiss:
+            break
+        if response.status_code != 200:
+            print(f"No yuyu-tei listing for {key} at {page_url}, status code: {response.status_code}")
+            break
+        for id, price in extract_price_map(response.text).items():
+            prices[id] = max(price, prices.get(id, price))
+        page_count = max(page_count, extract_listing_page_count(response.text))
+        page += 1
+    return prices
 
-# Read the URL from the JSON file based on the parameter or return all URLs if no key is provided
-def get_url_from_json(key=None):
+# Function to extract price from yuyutei
+def fetch_highest_price(jap_name: str, card_id: str, revalidate: bool = False, search_term: str = None) -> int:
+    complete_url = build_price_search_url(jap_name, card_id, search_term)
+
+    # Fetch the webpage
     try:
-        with open(SET_LISTS_FILENAME, "r") as json_file:
-            url_data = json.load(json_file)
-            if key:
-                return url_data.get(key, None)
-            else:
-                return url_data  # Return all URLs if no key is provided
-    except FileNotFoundError:
-        print("URL data file not found.")
+        response = http_client.get(complete_url, revalidate)
+    except http_client.OfflineCacheMiss:
+        # Offline and never searched before, so report the price as not found
+        return -1
+    
+    # Check if the request was successful
+    if response.status_code != 200:
+        raise Exception(f"Failed to fetch URL: {complete_url}, status code: {response.status_code}")
+    
+    return extract_highest_price(response.text, card_id)
+
+class PriceResolver:
+    """Answers every printing of a card from a single yuyu-tei search per name prefix.
+
+    The search results are parsed once into an id -> highest price map; ids that
+    the prefix search does not list fall back to the per-id fetch_highest_price.
+    Concurrent callers asking for the same prefix share one request.
+
+    When set_prices (from fetch_set_price_map) is given, ids it lists are
+    answered without any request at all. With revalidate=True cached search
+    pages are checked with the server even if they are still fresh.
+
+    max_requests caps searches and single-card lookups together; once it is
+    spent, get_price returns None for anything it would have to request.
+    """
+
+    def __init__(self, set_prices=None, revalidate=False, max_requests=None):
+        self.set_prices = set_prices or {}
+        self.revalidate = revalidate
+        self.max_requests = max_requests
+        self.searches = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        self._price_maps = {}
+
+    # Whether one more request fits in max_requests; called with the lock held
+    def _has_allowance(self):
+        return self.max_requests is None or self.searches + self.fallbacks < self.max_requests
+
+    # The id -> price map of a search, or None when the allowance ran out before it was made
+    def price_map(self, search_term):
+        with self._lock:
+            future = self._price_maps.get(search_term)
+            is_owner = future is None and self._has_allowance()
+            if is_owner:
+                future = self._price_maps[search_term] = Future()
+                self.searches += 1
+        if future is None:
+            return None
+        if is_owner:
+            try:
+                future.set_result(fetch_price_map(search_term, self.revalidate))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    # The per-id lookup for an id its search did not list, or None when the allowance is spent
+    def fetch_single(self, jap_name, card_id, search_term=None):
+        with self._lock:
+            if not self._has_allowance():
+                return None
+            self.fallbacks += 1
+        return fetch_highest_price(jap_name, card_id, self.revalidate, search_term)
+
+    def get_price(self, jap_name, card_id, search_term=None):
+        card_id = normalize_card_id(card_id)
+        if card_id in self.set_prices:
+            return self.set_prices[card_id]
+        search_term = search_term or find_consecutive_japanese(jap_name)
+        prices = self.price_map(search_term)
+        if prices is None:
+            return None
+        if card_id in prices:
+            return prices[card_id]
+        return self.fetch_single(jap_name, card_id, search_term)
+
+# Read the URL from the JSON file based on the parameter or return all URLs if no key is provided.
+# The file is only parsed again once it changes, see config.load_json.
+def get_url_from_json(key=None):
+    url_data = config.set_lists()
+    if url_data is None:
         return None
+    if key:
+        return url_data.get(key, None)
+    else:
+        return url_data  # Return all URLs if no key is provided
+
+# Collect (english_name, item_link, [(rarity, card_id), ...]) entries from the "Contents" section
+@metrics.timed("parse")
+def parse_contents_section(h2, url):
+    from html_parsing import find_in_segment, segment_text, split_on_br
+
+    entries = []
+    next_sibling = h2.find_next_sibling()
+
+    cat = 'Over Rare'
+    while next_sibling and next_sibling.name != 'h2':
+        if next_sibling.name == 'p':
+            cat = next_sibling.get_text(strip=True)
+            next_sibling = next_sibling.find_next_sibling()
+            continue
+        if next_sibling.name == 'ul':
+            for li in next_sibling.find_all('li'):
+                # Each <br/>-separated part of the <li> is one card, read straight from the tree
+                for part in split_on_br(li):
+                    a_tag = find_in_segment(part, 'a')
+                    if a_tag:
+                        english_name = str(a_tag.get_text(strip=True))
+                        item_link = urljoin(url, a_tag['href'])
+                    else:
+                        english_name = "No link text"
+                        item_link = "No reference"
+
+                    # Everything but the link text holds the card ids
+                    rarity = segment_text(part, exclude=a_tag)
+                    split_rarity = [x.strip() for x in rarity.split(",")]
+                    split_paragraph = [y.strip() for y in cat.split("/")]
+
+                    # Check if any of the paragraph parts contains " Treasure"
+                    treasure_part = [part for part in split_paragraph if " Treasure" in part]
+
+                    # If " Treasure" exists in any part, add " Treasure" to those that do not have
+                    if len(treasure_part) >= 1:
+                        for i in range(len(split_paragraph)):
+                            if " Treasure" not in split_paragraph[i]:
+                                split_paragraph[i] = split_paragraph[i] + " Treasure"
+
+                    max_length = max(len(split_paragraph), len(split_rarity))
+                    printings = []
+                    for i in range(max_length):
+                        rarity = split_paragraph[i % len(split_paragraph)]
+                        card_id = normalize_card_id(split_rarity[i % len(split_rarity)])
+                        printings.append((rarity, card_id))
+
+                    entries.append((english_name, item_link, printings))
+
+        next_sibling = next_sibling.find_next_sibling()
+    return entries
+
+# Resolve card metadata and prices concurrently, keeping the original row order
+def iter_contents(entries, workers=http_client.DEFAULT_WORKERS, price_resolver=None, journal=None):
+    plan = [(english_name, item_link, rarity, card_id)
+            for english_name, item_link, printings in entries
+            for rarity, card_id in printings]
+
+    # Rows finished by an earlier, interrupted run are taken from the journal as they are
+    done = [journal.completed_row(no, item_link, card_id) if journal else None
+            for no, (_, item_link, _, card_id) in enumerate(plan, start=1)]
+
+    # Every reference URL is fetched only once, even if a card is listed several times
+    links = list(dict.fromkeys(item_link for (_, item_link, _, _), row in zip(plan, done) if row is None))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        metadata = dict(zip(links, executor.map(metrics.bind(get_card_metadata), links)))
+
+        pending = []
+        for (english_name, item_link, rarity, card_id), row in zip(plan, done):
+            if row is None:
+                civilization, japanese_name = metadata[item_link]
+                pending.append((english_name, japanese_name, rarity, card_id, item_link, civilization))
+
+        # One yuyu-tei search per card name answers all of its printings.
+        # Prices arrive in order, so each row is yielded as soon as it is complete.
+        price_resolver = price_resolver or PriceResolver()
+        prices = executor.map(metrics.bind(price_resolver.get_price), [row[1] for row in pending], [row[3] for row in pending])
+        pending_rows = iter(pending)
+        for no, row in enumerate(done, start=1):
+            if row is None:
+                row = next(pending_rows) + (next(prices),)
+                if journal:
+                    journal.record(no, row)
+            yield row
+
+def set_csv_filename(key):
+    return f"./generated_csv/{key}.csv"
+
+def set_jsonl_filename(key):
+    return f"./generated_csv/{key}.jsonl"
+
+# JPY -> SGD rate of a day from exchange_rates.json, see pricing.py
+@lru_cache(maxsize=1)
+def sgd_rate_on(day):
+    return RateTable().rate("SGD", day)
+
+# Today's rate, read once per day even in a long-running process
+def sgd_rate():
+    return sgd_rate_on(date.today().isoformat())
+
+# One output record: the row data along with the key as the "Set" column
+def set_record(no, key, row):
+    english_name, japanese_name, rarity, id, reference, civilization, jp_price = row
+    return [no, rarity, id, japanese_name, english_name, civilization, key, reference, jp_price, convert_price(jp_price, sgd_rate()), 0]
+
+# Open the streaming writer for generated_csv/<key>.csv (and <key>.jsonl)
+def open_set_writer(key, jsonl=True):
+    # Ensure the directory exists
+    os.makedirs('./generated_csv', exist_ok=True)
+    sinks = [CsvSink(set_csv_filename(key), CSV_HEADER)]
+    if jsonl:
+        sinks.append(JsonLinesSink(set_jsonl_filename(key), CSV_HEADER))
+    return RowWriter(sinks)
+
+# Write one resolved row, counting the prices that were not found against the price host
+def write_row(writer, no, key, row):
+    with metrics.timer("write"):
+        writer.write(set_record(no, key, row))
+    metrics.count("rows_written")
+    if row[6] == -1:
+        metrics.count("price_misses", host=http_client.host_of(YUYUTEI_SEARCH_URL))
+
+# Stream resolved rows into the set's output files and return the number of rows written
+def write_set_rows(key, rows, jsonl=True):
+    with open_set_writer(key, jsonl) as writer:
+        for no, row in enumerate(rows, start=1):
+            write_row(writer, no, key, row)
+    return writer.count
+
+# Return the "Contents" <h2> of a fandom set page, or None
+def find_contents_header(soup):
+    for h2 in soup.find_all('h2'):
+        span = h2.find('span')
+        if span and "Contents" in span.get_text(strip=True):
+            return h2
+    return None
+
+# HTML of everything between the "Contents" <h2> and the next <h2>
+def section_html(h2):
+    parts = []
+    next_sibling = h2.find_next_sibling()
+    while next_sibling and next_sibling.name != 'h2':
+        parts.append(str(next_sibling))
+        next_sibling = next_sibling.find_next_sibling()
+    return ''.join(parts)
+
+# Parse a fandom set page and return its "Contents" <h2>, or None
+@metrics.timed("parse")
+def parse_set_page(html):
+    from html_parsing import ARTICLE_ONLY, make_soup
+
+    # The article body is enough, the site navigation around it is skipped
+    h2 = find_contents_header(make_soup(html, ARTICLE_ONLY))
+    if h2 is None:
+        h2 = find_contents_header(make_soup(html))
+    return h2
+
+# Concatenate the CSVs of the given sets, in order, into one catalog file
+def write_catalog(keys, catalog_filename=CATALOG_FILENAME):
+    os.makedirs(os.path.dirname(catalog_filename), exist_ok=True)
+    with open(catalog_filename, mode='w', newline='', encoding='utf-8') as catalog:
+        writer = csv.writer(catalog)
+        writer.writerow(CSV_HEADER)
+        for key in keys:
+            if not os.path.exists(set_csv_filename(key)):
+                continue
+            with open(set_csv_filename(key), newline='', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                next(reader, None)
+                # Currencies added by pricing.py follow the standard columns
+                writer.writerows(row[:len(CSV_HEADER)] for row in reader)
+    return catalog_filename
 
 # Main function to run the scraping code
-def scrape_website(url, key):
+def scrape_website(url, key, workers=http_client.DEFAULT_WORKERS, use_set_listing=False,
+                   resume=False, crawl_state=None, incremental=False, jsonl=True):
     start_time = time.time()
 
-    response = requests.get(url)
+    # In incremental mode the set page itself must be current, even if it is cached
+    try:
+        response = http_client.get(url, revalidate=incremental)
+    except http_client.OfflineCacheMiss:
+        print(f"{key} is not cached, skipping it in offline mode.")
+        return None
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
-        h2_tags = soup.find_all('h2')
-
-        for h2 in h2_tags:
-            span = h2.find('span')
-            if span and "Contents" in span.get_text(strip=True):
-                contents = []
-                next_sibling = h2.find_next_sibling()
-
-                cat = 'Over Rare'
-                while next_sibling and next_sibling.name != 'h2':
-                    if next_sibling.name == 'p':
-                        cat = next_sibling.get_text(strip=True)
-                        next_sibling = next_sibling.find_next_sibling()
-                        continue
-                    if next_sibling.name == 'ul':
-                        for li in next_sibling.find_all('li'):
-                            parts = li.decode_contents().split('<br/>')
-                            for part in parts:
-                                part_soup = BeautifulSoup(part, 'html.parser')
-                                a_tag = part_soup.find('a')
-                                if a_tag:
-                                    english_name = str(a_tag.get_text(strip=True))
-                                    item_link = urljoin(url, a_tag['href'])
-                                    a_tag.extract()
-                                else:
-                                    english_name = "No link text"
-                                    item_link = "No reference"
-
-                                rarity = str(part_soup.get_text(strip=True))
-                                split_rarity = [x.strip() for x in rarity.split(",")]
-                                split_paragraph = [y.strip() for y in cat.split("/")]
-
-                                # Check if any of the paragraph parts contains " Treasure"
-                                treasure_part = [part for part in split_paragraph if " Treasure" in part]
-
-                                # If " Treasure" exists in any part, add " Treasure" to those that do not have
-                                if len(treasure_part) >= 1:
-                                    for i in range(len(split_paragraph)):
-                                        if " Treasure" not in split_paragraph[i]:
-                                            split_paragraph[i] = split_paragraph[i] + " Treasure"
-
-                                max_length = max(len(split_paragraph), len(split_rarity))
-                                civilization, japanese_name = get_civilization_and_japanese_name(item_link)
-
-                                for i in range(max_length):
-                                    rarity = split_paragraph[i % len(split_paragraph)]
-
-                                    # Sanitize card id
-                                    card_id = split_rarity[i % len(split_rarity)]
-                                    card_id = card_id.replace("☆", "")
-                                    card_id = card_id.replace("㊙", "(秘)")
-                                    card_id = card_id.replace("0R", "OR")
-                                    card_id = re.sub(r'[\uFE00-\uFE0F]', '', card_id)
-                                    if card_id.startswith("超G"):
-                                        i=2
-                                        check_done=False
-                                        while i < len(card_id) and not check_done:
-                                            if card_id[i] == "超":
-                                                # If '超' is followed by 'G', add both to the result
-                                                if i + 1 < len(card_id) and card_id[i + 1] == "G":
-                                                    check_done=True
-                                                else:
-                                                    card_id=card_id[:i+1]+"G"+card_id[i+1:]
-                                                    check_done=True
-                                            else:
-                                                i += 1  # Move to the next character
-
-
-                                    price = fetch_highest_price(japanese_name, card_id)
-                                    contents.append((english_name, japanese_name, rarity, card_id, item_link, civilization, price))
-
-                    next_sibling = next_sibling.find_next_sibling()
-
-                if contents:
-                    # Ensure the directory exists
-                    os.makedirs('./generated_csv', exist_ok=True)
-
-                    # Dynamically generate the CSV filename using the key (the URL key)
-                    csv_filename = f"./generated_csv/{key}.csv"
-                    with open(csv_filename, mode='w', newline='', encoding='utf-8') as file:
-                        writer = csv.writer(file)
-                        # Add "Set" column header
-                        writer.writerow(["No", "Rarity", "Id", "Japanese Name", "English Name", "Civilization", "Set", "Reference", "Price (Yen)", "Price (SGD)", "Qty"])
-                        for no, (english_name, japanese_name, rarity, id, reference, civilization, jp_price) in enumerate(contents, start=1):
-                            # Write the data along with the key as the "Set" column
-                            writer.writerow([no, rarity, id, japanese_name, english_name, civilization, key, reference, jp_price, round(jp_price*RATE, 2) if jp_price>-1 else jp_price, 0])
-
-                    end_time = time.time()
-                    duration = end_time - start_time
-                    print(f"Contents saved to {csv_filename}")
-                    print(f"Scraping completed in {duration:.2f} seconds.")
-                else:
-                    print("No items found in the Contents section.")
-                break
+        h2 = parse_set_page(response.text)
+
+        if h2:
+            signature = page_signature(response.text, section_html(h2))
+            if incremental and crawl_state and crawl_state.is_unchanged(key, signature) and os.path.exists(set_csv_filename(key)):
+                print(f"{key} has not changed since the last run, skipping.")
+                return
+
+            # Every resolved row is journaled, so an interrupted run can be resumed
+            journal = RowJournal(key, resume=resume)
+            if journal.resumed_rows:
+                print(f"Resuming {key} with {journal.resumed_rows} rows already done.")
+            try:
+                price_resolver = PriceResolver(fetch_set_price_map(key) if use_set_listing else None)
+                rows = iter_contents(parse_contents_section(h2, url), workers, price_resolver, journal)
+                # Rows reach generated_csv/<key>.csv.part as they are resolved
+                row_count = write_set_rows(key, rows, jsonl)
+            finally:
+                journal.close()
+
+            if row_count:
+                csv_filename = set_csv_filename(key)
+                journal.discard()
+                if crawl_state:
+                    crawl_state.update(key, signature)
+
+                end_time = time.time()
+                duration = end_time - start_time
+                print(f"Contents saved to {csv_filename}")
+                print(f"Scraping completed in {duration:.2f} seconds.")
+                return csv_filename
+            else:
+                print("No items found in the Contents section.")
         else:
             print("Contents section not found.")
     else:
         print(f"Failed to fetch the webpage. Status code: {response.status_code}")
 
 
-if __name__ == "__main__":
-    url_data = get_url_from_json()
+def build_arg_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=f"Scrape card lists and prices for the sets in {SET_LISTS_FILENAME}.")
+    parser.add_argument("key", nargs="?", help="Only scrape sets whose key starts with this prefix.")
+    parser.add_argument("--workers", type=int, default=http_client.DEFAULT_WORKERS, help="Number of concurrent card page and price requests.")
+    parser.add_argument("--host-limit", type=int, default=http_client.DEFAULT_HOST_LIMIT, help="Maximum concurrent requests per host.")
+    parser.add_argument("--rate", action="append", default=[], type=rate_limiter.parse_host_rate, metavar="HOST=RPS",
+                        help="Requests per second allowed against HOST (repeatable).")
+    parser.add_argument("--default-rate", type=float, default=rate_limiter.DEFAULT_RATE, help="Requests per second for hosts without --rate.")
+    parser.add_argument("--max-retries", type=int, default=rate_limiter.DEFAULT_MAX_RETRIES, help="Retries on 429, 5xx and connection errors.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Scrape all selected sets concurrently with the asyncio engine.")
+    parser.add_argument("--cache", default=http_cache.CACHE_FILENAME, help="SQLite file used to cache fetched pages.")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch pages from the network.")
+    parser.add_argument("--offline", action="store_true", help="Serve pages only from the cache, without any network access.")
+    parser.add_argument("--set-listing", action="store_true", help="Read prices from the yuyu-tei listing of each set, searching only for cards it misses.")
+    parser.add_argument("--resume", action="store_true", help="Reuse the rows journaled by an interrupted run instead of resolving them again.")
+    parser.add_argument("--incremental", action="store_true", help="Only scrape sets whose fandom page changed since their CSV was written.")
+    parser.add_argument("--crawl-state", default=CRAWL_STATE_FILENAME, help="JSON file recording the page version behind each generated CSV.")
+    parser.add_argument("--card-index", default=CARD_INDEX_FILENAME, help="JSON file holding known card metadata.")
+    parser.add_argument("--no-card-index", action="store_true", help="Fetch every card page instead of using the card index.")
+    parser.add_argument("--price-history", default=PRICE_HISTORY_FILENAME, help="SQLite file recording every price change.")
+    parser.add_argument("--no-price-history", action="store_true", help="Do not record the scraped prices in the price history.")
+    parser.add_argument("--no-jsonl", dest="jsonl", action="store_false", help="Only write CSV, without the JSON Lines copy of each set.")
+    parser.add_argument("--refresh-prices", action="store_true",
+                        help="Only re-price the most urgent cards of the already scraped sets, without crawling fandom.")
+    parser.add_argument("--budget", type=int, default=REFRESH_BUDGET, help="yuyu-tei requests (searches and single-card lookups) allowed per --refresh-prices run.")
+    parser.add_argument("--metrics-report", default=metrics.REPORT_FILENAME, help="JSON file for the per-stage, per-set and per-host run report.")
+    parser.add_argument("--prometheus", help="Also write the run metrics to this Prometheus text file.")
+    parser.add_argument("--jobs", type=int, default=1, help="Scrape sets in this many worker processes sharing one rate budget.")
+    parser.add_argument("--plan", action="store_true",
+                        help="Parse every selected set first, then fetch each card page and price shared between sets only once.")
+    return parser
+
+# Apply the command-line settings to the fetchers and return (card_index, crawl_state).
+# Worker processes pass the parent's shared rate limiter and leave seeding and saving to it.
+def configure(args, limiter=None, worker=False):
+    http_client.set_host_limit(args.host_limit)
+    http_client.set_rate_limiter(limiter or rate_limiter.RateLimiter(dict(args.rate), args.default_rate), args.max_retries)
+    if not args.no_cache:
+        http_client.set_cache(http_cache.HTTPCache(args.cache), offline=args.offline)
+    card_index = None
+    if not args.no_card_index:
+        card_index = CardIndex(args.card_index)
+        if not worker:
+            seeded = card_index.seed_from_csv_dir(HISTORICAL_CSV_DIR)
+            print(f"Card index loaded with {len(card_index)} cards ({seeded} seeded from {HISTORICAL_CSV_DIR}).")
+        set_card_index(card_index)
+    crawl_state = CrawlState(args.crawl_state, autosave=not worker)
+    return card_index, crawl_state
+
+# Write the run report, and the Prometheus text file when asked for
+def write_metrics(args):
+    print(f"Run report saved to {metrics.write_report(args.metrics_report, argv=sys.argv[1:])}")
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus)
+
+
+def main(argv=None, prog=None):
+    parser = build_arg_parser(prog)
+    args = parser.parse_args(argv)
+
+    if args.offline and args.no_cache:
+        parser.error("--offline cannot be combined with --no-cache")
+    if args.jobs > 1 and args.use_async:
+        parser.error("--jobs cannot be combined with --async")
+    if args.refresh_prices and (args.jobs > 1 or args.use_async or args.no_price_history):
+        parser.error("--refresh-prices cannot be combined with --jobs, --async or --no-price-history")
+    if args.plan and (args.jobs > 1 or args.use_async or args.resume or args.refresh_prices):
+        parser.error("--plan cannot be combined with --jobs, --async, --resume or --refresh-prices")
+
+    card_index, crawl_state = configure(args)
+
+    if args.refresh_prices:
+        import price_refresh
+        price_refresh.run(args.key, args.budget, args.workers, args.price_history, args.jsonl)
+        write_metrics(args)
+        return
+    url_data = get_url_from_json() or {}
 
     # Check if a key was provided as a command-line argument
-    if len(sys.argv) == 2:
-        prompt = sys.argv[1].upper()
-        found_key = False
-
-        for key, url in url_data.items():
-            if key.startswith(prompt.upper()):
-                found_key = True
-                print(f"Scraping data for {key}...")
-                scrape_website(url, key)
-                print(f"Resting...\n")
-                time.sleep(5)
-
-        if not found_key:
-            print(f"No URLs found in {SET_LISTS_FILENAME}.")
-        
+    if args.key:
+        prompt = args.key.upper()
+        selected = {key: url for key, url in url_data.items() if key.startswith(prompt)}
     else:
         # If no key is provided, iterate over all key-value pairs in the JSON file
-        if url_data:
-            for key, url in url_data.items():
-                print(f"Scraping data for {key}...")
-                scrape_website(url, key)
-                print(f"Resting...\n")
-                time.sleep(5)
-        else:
-            print(f"No URLs found in {SET_LISTS_FILENAME}.")
\ No newline at end of file
+        selected = url_data
+
+    scraped = {}
+    if not selected:
+        print(f"No URLs found in {SET_LISTS_FILENAME}.")
+    elif args.jobs > 1:
+        import parallel_crawl
+        if card_index is not None:
+            # Workers load the index from disk, so they start with the seeded cards
+            card_index.save()
+        scraped = parallel_crawl.run(selected, args, card_index, crawl_state)
+        print(f"Catalog saved to {write_catalog(selected)}")
+    elif args.plan:
+        import crawl_planner
+        scraped = crawl_planner.run(selected, args.workers, args.set_listing, crawl_state, args.incremental, args.jsonl)
+    elif args.use_async:
+        import async_scraper
+        scraped = async_scraper.run(selected, args.workers, args.host_limit, card_index, args.set_listing,
+                                    args.resume, crawl_state, args.incremental, args.jsonl)
+    else:
+        for key, url in selected.items():
+            print(f"Scraping data for {key}...")
+            # A set that still fails after the retries keeps its journal for --resume, the others go on
+            try:
+                with metrics.set_scope(key):
+                    scraped[key] = scrape_website(url, key, args.workers, args.set_listing, args.resume, crawl_state,
+                                                  args.incremental, args.jsonl)
+            except Exception as e:
+                print(f"[{key}] Scraping failed: {e}")
+                scraped[key] = None
+            if card_index is not None:
+                card_index.save()
+
+    # Every set of this run is recorded under one timestamp, only prices that moved are stored
+    if not args.no_price_history and any(scraped.values()):
+        history = PriceHistory(args.price_history)
+        observed_at = timestamp()
+        for key, csv_filename in scraped.items():
+            if csv_filename:
+                print(f"{key}: {history.record_csv(key, csv_filename, observed_at)} price changes recorded.")
+        history.close()
+
+    if card_index is not None:
+        card_index.save()
+        print(f"Card index: {card_index.hits} hits, {card_index.misses} misses.")
+    write_metrics(args)
+
+
+if __name__ == "__main__":
+    main()
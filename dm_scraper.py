@@ -0,0 +1,33 @@
+import argparse
+import importlib
+
+# Subcommand -> (module, arguments put in front of the user's, help). A module is
+# only imported once its command runs, so --help and argument errors are instant.
+COMMANDS = {
+    "list": ("list_scraper", [], "Scrape set links from the eras in set_eras.json into set_lists.json."),
+    "data": ("data_scraper", [], "Scrape card lists and prices for the sets in set_lists.json."),
+    "prices": ("data_scraper", ["--refresh-prices"],
+               "Re-price the most urgent cards of the already scraped sets within a search budget."),
+}
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Duel Masters set, card and price scraper.",
+        epilog="\n".join(f"  {command:<8}{help}" for command, (_, _, help) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS, help="What to scrape; see below.")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments of the command, see <command> --help.")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    module_name, command_args, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    return module.main(command_args + args.args, prog=f"{parser.prog} {args.command}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+from bs4 import BeautifulSoup, NavigableString, SoupStrainer, Tag
+from bs4.element import PreformattedString
+
+# lxml builds the tree several times faster than the pure-Python html.parser
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# Only the parts of each page the scrapers read are turned into a tree
+ARTICLE_ONLY = SoupStrainer("div", class_="mw-parser-output")
+PRICE_LIST_ONLY = SoupStrainer("div", id="card-list3")
+PAGINATION_ONLY = SoupStrainer(class_="pagination")
+
+
+def make_soup(html, parse_only=None):
+    return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+def _is_text(node):
+    # Comments, doctypes and the like are not part of get_text()
+    return isinstance(node, NavigableString) and not isinstance(node, PreformattedString)
+
+
+def split_on_br(tag):
+    """Split the children of tag into lists of nodes separated by top-level <br> tags."""
+    segments = [[]]
+    for child in tag.children:
+        if isinstance(child, Tag) and child.name == "br":
+            segments.append([])
+        else:
+            segments[-1].append(child)
+    return segments
+
+
+def find_in_segment(segment, name):
+    """First tag called name in document order within a list of sibling nodes."""
+    for node in segment:
+        if isinstance(node, Tag):
+            if node.name == name:
+                return node
+            found = node.find(name)
+            if found is not None:
+                return found
+    return None
+
+
+def segment_text(segment, exclude=None):
+    """get_text(strip=True) of a list of sibling nodes, leaving out the subtree of exclude."""
+    exclude_ancestors = {id(parent) for parent in exclude.parents} if exclude is not None else set()
+    return _segment_text(segment, exclude, exclude_ancestors)
+
+
+def _segment_text(nodes, exclude, exclude_ancestors):
+    parts = []
+    for node in nodes:
+        if node is exclude:
+            continue
+        if _is_text(node):
+            parts.append(node.strip())
+        elif isinstance(node, Tag):
+            if id(node) in exclude_ancestors:
+                parts.append(_segment_text(node.children, exclude, exclude_ancestors))
+            else:
+                parts.append(node.get_text(strip=True))
+    return "".join(parts)
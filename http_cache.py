@@ -0,0 +1,136 @@
+import sqlite3
+import threading
+import time
+import zlib
+
+CACHE_FILENAME = "http_cache.sqlite3"
+
+# How long a cached page is served without asking the server again, in seconds.
+# Card metadata on fandom almost never changes, yuyu-tei prices move daily.
+HOST_TTLS = {
+    "duelmasters.fandom.com": 30 * 24 * 3600,
+    "yuyu-tei.jp": 6 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+# Least recently used entries are evicted once the stored bodies exceed this size
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+# A plain ConnectionError, so importing the cache does not load requests
+class OfflineCacheMiss(ConnectionError):
+    """Raised in offline mode for a URL that is not in the cache."""
+
+
+class CachedResponse:
+    """The subset of requests.Response used by the scrapers, rebuilt from the cache."""
+
+    def __init__(self, url, status_code, content, encoding, headers=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+
+class CacheEntry:
+    def __init__(self, url, content, encoding, etag, last_modified, fetched_at):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl, now=None):
+        return (now or time.time()) - self.fetched_at < ttl
+
+    def validators(self):
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def response(self):
+        return CachedResponse(self.url, 200, self.content, self.encoding)
+
+
+class HTTPCache:
+    """URL-keyed store of successful responses, kept zlib-compressed in SQLite."""
+
+    def __init__(self, path=CACHE_FILENAME, max_bytes=DEFAULT_MAX_BYTES, host_ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.host_ttls = dict(HOST_TTLS, **(host_ttls or {}))
+        self._lock = threading.Lock()
+        # The timeout lets several crawl processes wait for each other's writes
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " encoding TEXT,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._conn.commit()
+
+    def ttl_for(self, host):
+        return self.host_ttls.get(host, DEFAULT_TTL)
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, encoding, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        body, encoding, etag, last_modified, fetched_at = row
+        return CacheEntry(url, zlib.decompress(body), encoding, etag, last_modified, fetched_at)
+
+    def store(self, url, response):
+        body = zlib.compress(response.content)
+        encoding = response.encoding or response.apparent_encoding
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body, len(body), encoding, response.headers.get("ETag"),
+                 response.headers.get("Last-Modified"), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def mark_revalidated(self, url):
+        """Restart the TTL of an entry after the server answered 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
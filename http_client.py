@@ -0,0 +1,166 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import metrics
+from http_cache import OfflineCacheMiss
+from rate_limiter import DEFAULT_MAX_RETRIES, RateLimiter, backoff_delay, retry_after_seconds
+
+# Default size of the worker pool used to fan out card page and price requests
+DEFAULT_WORKERS = 8
+# Maximum number of requests allowed in flight against a single host
+DEFAULT_HOST_LIMIT = 4
+# Seconds to wait for a server before giving up on a request
+DEFAULT_TIMEOUT = 30
+
+_host_limit = DEFAULT_HOST_LIMIT
+_host_semaphores = {}
+_sessions = {}
+_lock = threading.Lock()
+_cache = None
+_offline = False
+_rate_limiter = RateLimiter()
+_max_retries = DEFAULT_MAX_RETRIES
+_transport = None
+
+
+def host_of(url):
+    return urlparse(url).netloc
+
+
+def get_host_limit():
+    return _host_limit
+
+
+def set_host_limit(limit):
+    """Set the per-host concurrency cap used by all subsequent requests."""
+    global _host_limit
+    with _lock:
+        _host_limit = max(1, int(limit))
+        _host_semaphores.clear()
+        # Connection pools are sized from the cap, so rebuild them lazily
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _host_semaphore(host):
+    with _lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(_host_limit)
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+
+# One keep-alive session per host, so card pages and price searches reuse connections.
+# requests is only imported once the first request is made.
+def get_session(host):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = _transport or HTTPAdapter(pool_connections=1, pool_maxsize=_host_limit)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def set_transport(adapter):
+    """Send every request through a requests transport adapter, e.g. one replaying saved pages."""
+    global _transport
+    close_sessions()
+    _transport = adapter
+
+
+def close_sessions():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def set_cache(cache, offline=False):
+    """Serve requests through an http_cache.HTTPCache; offline answers from it alone."""
+    global _cache, _offline
+    if offline and cache is None:
+        raise ValueError("Offline mode needs a cache to serve from.")
+    _cache = cache
+    _offline = offline
+
+
+def set_rate_limiter(rate_limiter, max_retries=DEFAULT_MAX_RETRIES):
+    """Throttle every host through rate_limiter and retry failed requests up to max_retries times."""
+    global _rate_limiter, _max_retries
+    _rate_limiter = rate_limiter
+    _max_retries = max_retries
+
+
+def _should_retry(response):
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def _fetch(url, host, **kwargs):
+    import requests
+
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    bucket = _rate_limiter.bucket(host)
+    attempt = 0
+    while True:
+        bucket.acquire()
+        try:
+            with _host_semaphore(host), metrics.timer("fetch", host):
+                response = get_session(host).get(url, **kwargs)
+            metrics.count("requests", host=host)
+            metrics.count("bytes_downloaded", len(response.content), host)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= _max_retries:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            if not _should_retry(response):
+                bucket.reward()
+                return response
+            if attempt >= _max_retries:
+                return response
+            if response.status_code == 429:
+                bucket.penalize()
+            # Honour Retry-After when the server sends one, otherwise back off with jitter
+            delay = retry_after_seconds(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = backoff_delay(attempt)
+        # Wait outside the host semaphore so other requests are not blocked by the retry
+        time.sleep(delay)
+        attempt += 1
+        metrics.count("retries", host=host)
+
+
+# Drop-in replacement for requests.get that never exceeds the per-host cap.
+# revalidate=True asks the server even when the cached copy is still fresh.
+def get(url, revalidate=False, **kwargs):
+    host = host_of(url)
+    if _cache is None:
+        return _fetch(url, host, **kwargs)
+
+    entry = _cache.lookup(url)
+    if entry and (_offline or (not revalidate and entry.is_fresh(_cache.ttl_for(host)))):
+        metrics.count("cache_hits", host=host)
+        return entry.response()
+    metrics.count("cache_misses" if entry is None else "cache_revalidations", host=host)
+    if _offline:
+        raise OfflineCacheMiss(f"{url} is not cached and network access is disabled")
+
+    # Stale entries are revalidated with ETag / Last-Modified where available
+    if entry:
+        kwargs["headers"] = dict(entry.validators(), **kwargs.get("headers", {}))
+    response = _fetch(url, host, **kwargs)
+    if response.status_code == 304 and entry:
+        _cache.mark_revalidated(url)
+        return entry.response()
+    if response.status_code == 200:
+        _cache.store(url, response)
+    return response
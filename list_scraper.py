@@ -1,133 +1,32 @@
-import requests
+import http_client
+import metrics
 import json
 import argparse
-from bs4 import BeautifulSoup
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
 import time  # Import the time module
 
-# Start timing
-start_time = time.time()
-
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description="Scrape links from a specific era in set_eras.json.")
-parser.add_argument("key", type=str, help="The key to look up the URL in set_eras.json.")
-args = parser.parse_args()
-
-# Load the base URL from the JSON file
-json_file = "set_eras.json"
-try:
-    with open(json_file, "r") as f:
-        data = json.load(f)
-except FileNotFoundError:
-    print(f"Error: The file {json_file} was not found.")
-    exit()
-except json.JSONDecodeError:
-    print(f"Error: The file {json_file} is not a valid JSON file.")
-    exit()
-
-# Convert the input key to lowercase for case-insensitive comparison
-input_key = args.key.lower()
-
-# Get the URL for the specified key (case-insensitive)
-base_url = None
-for key, url in data.items():
-    if key.lower() == input_key:
-        base_url = url
-        break
-
-if not base_url:
-    print(f"Error: No URL found for key '{args.key}' in {json_file}.")
-    exit()
+import config
+from config import ERAS_FILENAME, SET_LISTS_FILENAME, load_json
 
 # The root base URL that will be prepended
 root_url = "https://duelmasters.fandom.com"
 
-# Target URL
-target_url = base_url
 
-# Make a GET request to fetch the page content
-response = requests.get(target_url)
-if response.status_code != 200:
-    print(f"Failed to fetch the page. Status code: {response.status_code}")
-    exit()
+# Look for the <h2> with any <span> containing the given text
+def find_h2_with_span(soup, text):
+    for h2 in soup.find_all("h2"):
+        for span in h2.find_all("span"):  # Find all <span> elements inside the <h2>
+            if text in span.get_text(strip=True):
+                return h2
+    return None
 
-# Parse the page content with BeautifulSoup
-soup = BeautifulSoup(response.text, "html.parser")
 
-# Find all <h2> tags
-h2_tags = soup.find_all("h2")
-
-# Look for the <h2> with any <span> containing "Products"
-products_header = None
-for h2 in h2_tags:
-    spans = h2.find_all("span")  # Find all <span> elements inside the <h2>
-    for span in spans:
-        if "Products" in span.get_text(strip=True):
-            products_header = h2
-            break
-    if products_header:
-        break
-
-if not products_header:
-    print("No <h2> tag with any <span> containing the text 'Products' found.")
-    exit()
-
-# Find all <ul> tags immediately following the <h2> tag
-next_ul_tags = []
-current_tag = products_header.find_next()
-while current_tag:
-    if current_tag.name == "ul":
-        next_ul_tags.append(current_tag)
-    elif current_tag.name == "h2":  # Stop if we reach the next <h2>
-        break
-    current_tag = current_tag.find_next()
-
-# Initialize a list to collect all links
-full_links = []
-
-# For each <ul> found, look for <li> and then <a> tags within them
-for ul_tag in next_ul_tags:
-    li_tags = ul_tag.find_all("li")
-    for li in li_tags:
-        a_tag = li.find("a", href=True)  # Look for <a> tags inside <li>
-        if a_tag:
-            link = a_tag["href"]
-            # Ensure no period is appended by ensuring the link is clean
-            if not link.endswith("."):
-                full_link = root_url + link  # Prepend root_url instead of base_url
-                full_links.append(full_link)
-
-# Now process each full_link
-for link in full_links:
-    # Make a GET request to fetch the page content for the current link
-    response = requests.get(link)
-    if response.status_code != 200:
-        print(f"Failed to fetch the page: {link}. Status code: {response.status_code}")
-        continue
-
-    # Parse the page content with BeautifulSoup
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    # Find all <h2> tags on the page
-    h2_tags = soup.find_all("h2")
-
-    # Look for the <h2> with any <span> containing "List of Sets"
-    list_of_sets_header = None
-    for h2 in h2_tags:
-        spans = h2.find_all("span")  # Find all <span> elements inside the <h2>
-        for span in spans:
-            if "List of Sets" in span.get_text(strip=True):
-                list_of_sets_header = h2
-                break
-        if list_of_sets_header:
-            break
-
-    if not list_of_sets_header:
-        print(f"No <h2> tag with any <span> containing the text 'List of Sets' found on {link}.")
-        continue
-
-    # Find all <ul> tags immediately following the <h2> tag
+# Find all <a> tags inside the <li> of the <ul> tags following the <h2>, up to the next <h2>
+def find_list_links(header):
     next_ul_tags = []
-    current_tag = list_of_sets_header.find_next()
+    current_tag = header.find_next()
     while current_tag:
         if current_tag.name == "ul":
             next_ul_tags.append(current_tag)
@@ -135,41 +34,146 @@ for link in full_links:
             break
         current_tag = current_tag.find_next()
 
-    # Initialize a dictionary to collect all links for the current page
-    page_links = {}
-
-    # For each <ul> found, look for <li> and then <a> tags within them
+    a_tags = []
     for ul_tag in next_ul_tags:
-        li_tags = ul_tag.find_all("li")
-        for li in li_tags:
+        for li in ul_tag.find_all("li"):
             a_tag = li.find("a", href=True)  # Look for <a> tags inside <li>
             if a_tag:
-                page_link = a_tag["href"]
-                # Prepend root_url
-                full_link = page_link if page_link.startswith('http') else root_url + page_link
-                link_text = a_tag.get_text(strip=True).split(" ", 1)[0]  # Split and take the first part as the key
-                page_links[link_text] = full_link
-
-    # Now, load the existing data from set_lists.json
-    set_lists_file = "set_lists.json"
-    try:
-        with open(set_lists_file, "r") as f:
-            set_lists = json.load(f)
-    except FileNotFoundError:
+                a_tags.append(a_tag)
+    return a_tags
+
+
+# Return the product links listed under "Products" on an era page, or None on failure
+def get_product_links(era_url):
+    from html_parsing import make_soup
+
+    response = http_client.get(era_url)
+    if response.status_code != 200:
+        print(f"Failed to fetch the page: {era_url}. Status code: {response.status_code}")
+        return None
+
+    with metrics.timer("parse"):
+        products_header = find_h2_with_span(make_soup(response.text), "Products")
+    if not products_header:
+        print(f"No <h2> tag with any <span> containing the text 'Products' found on {era_url}.")
+        return None
+
+    full_links = []
+    for a_tag in find_list_links(products_header):
+        link = a_tag["href"]
+        # Ensure no period is appended by ensuring the link is clean
+        if not link.endswith("."):
+            full_links.append(root_url + link)  # Prepend root_url instead of base_url
+    return full_links
+
+
+# Return {set key: set URL} for everything under "List of Sets" on a product page
+def get_set_links(link):
+    from html_parsing import make_soup
+
+    response = http_client.get(link)
+    if response.status_code != 200:
+        print(f"Failed to fetch the page: {link}. Status code: {response.status_code}")
+        return {}
+
+    with metrics.timer("parse"):
+        list_of_sets_header = find_h2_with_span(make_soup(response.text), "List of Sets")
+    if not list_of_sets_header:
+        print(f"No <h2> tag with any <span> containing the text 'List of Sets' found on {link}.")
+        return {}
+
+    page_links = {}
+    for a_tag in find_list_links(list_of_sets_header):
+        page_link = a_tag["href"]
+        # Prepend root_url
+        full_link = page_link if page_link.startswith('http') else root_url + page_link
+        link_text = a_tag.get_text(strip=True).split(" ", 1)[0]  # Split and take the first part as the key
+        page_links[link_text] = full_link
+    return page_links
+
+
+# Traverse era -> products -> "List of Sets" for every era URL, fetching product pages concurrently
+def scrape_eras(era_urls, workers=http_client.DEFAULT_WORKERS):
+    product_links = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for era_links in executor.map(get_product_links, era_urls):
+            product_links.extend(era_links or [])
+
+        # Later products win on duplicate keys, as when each page was written in turn
         set_lists = {}
-    except json.JSONDecodeError:
-        print(f"Error: The file {set_lists_file} is not a valid JSON file.")
-        exit()
+        for link, page_links in zip(product_links, executor.map(get_set_links, product_links)):
+            set_lists.update(page_links)
+            if page_links:
+                print(f"Found {len(page_links)} sets on {link}.")
+    return set_lists
+
+
+# Merge the new links into set_lists.json with a single atomic write
+def write_set_lists(page_links, set_lists_file=SET_LISTS_FILENAME):
+    set_lists = {}
+    if os.path.exists(set_lists_file):
+        set_lists = load_json(set_lists_file)
+        if set_lists is None:
+            return False
 
     # Update the set_lists with the new page_links
     set_lists.update(page_links)
 
-    # Write the updated dictionary to set_lists.json
-    with open(set_lists_file, "w") as f:
+    tmp_file = f"{set_lists_file}.tmp"
+    with open(tmp_file, "w") as f:
         json.dump(set_lists, f, indent=4)
-
-    print(f"Links from {link} have been successfully added/updated in {set_lists_file}.")
-
-# Calculate and print the time taken
-end_time = time.time()
-print(f"Time taken: {end_time - start_time:.2f} seconds")
+    os.replace(tmp_file, set_lists_file)
+    return True
+
+
+# Resolve era keys (case-insensitive, or "all") to their URLs in set_eras.json
+def select_eras(data, keys):
+    if any(key.lower() == "all" for key in keys):
+        return dict(data)
+    by_lower = {key.lower(): key for key in data}
+    selected = {}
+    for key in keys:
+        if key.lower() in by_lower:
+            era = by_lower[key.lower()]
+            selected[era] = data[era]
+        else:
+            print(f"Error: No URL found for key '{key}' in {ERAS_FILENAME}.")
+    return selected
+
+
+def main(argv=None, prog=None):
+    # Start timing
+    start_time = time.time()
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(prog=prog, description=f"Scrape set links from eras in {ERAS_FILENAME}.")
+    parser.add_argument("keys", nargs="+", type=str, help=f"Keys to look up in {ERAS_FILENAME}, or 'all'.")
+    parser.add_argument("--workers", type=int, default=http_client.DEFAULT_WORKERS, help="Number of product pages fetched concurrently.")
+    parser.add_argument("--metrics-report", help="Write a JSON report of the fetch and parse metrics to this file.")
+    args = parser.parse_args(argv)
+
+    # Load the base URL from the JSON file
+    data = config.set_eras()
+    if data is None:
+        return
+
+    eras = select_eras(data, args.keys)
+    if not eras:
+        return
+
+    set_lists = scrape_eras(list(eras.values()), args.workers)
+    if set_lists and write_set_lists(set_lists):
+        print(f"{len(set_lists)} links from {', '.join(eras)} have been successfully added/updated in {SET_LISTS_FILENAME}.")
+    else:
+        print(f"No links were added to {SET_LISTS_FILENAME}.")
+
+    if args.metrics_report:
+        metrics.write_report(args.metrics_report, argv=sys.argv[1:])
+
+    # Calculate and print the time taken
+    end_time = time.time()
+    print(f"Time taken: {end_time - start_time:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
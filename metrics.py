@@ -0,0 +1,212 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+REPORT_FILENAME = "run_report.json"
+PROMETHEUS_PREFIX = "dm_scraper"
+
+# Every sample is labelled with the set being scraped (see set_scope) and, where it
+# applies, the host. ThreadPoolExecutor workers do not inherit the set, so functions
+# handed to one are wrapped with bind().
+_current_set = contextvars.ContextVar("metrics_set", default=None)
+_lock = threading.Lock()
+# (name, labels) -> value, labels being a sorted tuple of (label, value) pairs
+_counters = {}
+# (stage, labels) -> [calls, thread seconds, first start, last end]. Pool threads overlap,
+# so the summed seconds can exceed the wall time; the stage's wall time is the span from
+# its first start to its last end, both as time.time() so other processes' samples compare.
+_timers = {}
+_started = time.time()
+
+
+def _labels(host=None, **labels):
+    labels["set"] = _current_set.get()
+    labels["host"] = host
+    return tuple(sorted((label, value) for label, value in labels.items() if value))
+
+
+def count(name, value=1, host=None):
+    key = (name, _labels(host))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(stage, seconds, host=None, **labels):
+    key = (stage, _labels(host, **labels))
+    end = time.time()
+    with _lock:
+        _add_timer(key, 1, seconds, end - seconds, end)
+
+
+# Called with the lock held
+def _add_timer(key, calls, seconds, start, end):
+    timer = _timers.get(key)
+    if timer is None:
+        _timers[key] = [calls, seconds, start, end]
+    else:
+        timer[0] += calls
+        timer[1] += seconds
+        timer[2] = min(timer[2], start)
+        timer[3] = max(timer[3], end)
+
+
+@contextmanager
+def timer(stage, host=None, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, host, **labels)
+
+
+def timed(stage, **labels):
+    """Decorator timing every call of a function as the given stage."""
+    def decorate(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            with timer(stage, **labels):
+                return func(*args, **kwargs)
+        return run
+    return decorate
+
+
+@contextmanager
+def set_scope(key):
+    """Attribute everything recorded inside the block (and its tasks) to the set key."""
+    token = _current_set.set(key)
+    try:
+        yield
+    finally:
+        _current_set.reset(token)
+
+
+def bind(func):
+    """Wrap func so it records under the current set when it runs on another thread."""
+    key = _current_set.get()
+
+    def run(*args, **kwargs):
+        with set_scope(key):
+            return func(*args, **kwargs)
+    return run
+
+
+def take():
+    """Everything recorded so far, in a picklable form, and start over; see merge()."""
+    with _lock:
+        samples = {"counters": list(_counters.items()), "timers": list(_timers.items())}
+        _counters.clear()
+        _timers.clear()
+    return samples
+
+
+def merge(samples):
+    """Add samples taken in another process, e.g. a parallel_crawl worker."""
+    with _lock:
+        for key, value in samples["counters"]:
+            _counters[key] = _counters.get(key, 0) + value
+        for key, timer in samples["timers"]:
+            _add_timer(key, *timer)
+
+
+def reset():
+    global _started
+    take()
+    _started = time.time()
+
+
+def _empty_group():
+    return {"counters": {}, "wall_seconds": {}, "thread_seconds": {}, "calls": {}}
+
+
+def _group(by):
+    """{label value: {"counters", "wall_seconds", "thread_seconds", "calls"}} over the samples carrying the label.
+
+    wall_seconds is the span from a stage's first start to its last end within the
+    group; thread_seconds adds up the time of every call, on whichever thread it ran.
+    """
+    groups = {}
+    spans = {}
+    with _lock:
+        counters = list(_counters.items())
+        timers = [(key, list(timer)) for key, timer in _timers.items()]
+    for (name, labels), value in counters:
+        labels = dict(labels)
+        if by is None or by in labels:
+            group = groups.setdefault(labels.get(by), _empty_group())
+            group["counters"][name] = group["counters"].get(name, 0) + value
+    for (stage, labels), (calls, seconds, start, end) in timers:
+        labels = dict(labels)
+        if by is None or by in labels:
+            group = groups.setdefault(labels.get(by), _empty_group())
+            group["thread_seconds"][stage] = round(group["thread_seconds"].get(stage, 0.0) + seconds, 4)
+            group["calls"][stage] = group["calls"].get(stage, 0) + calls
+            span = spans.setdefault((labels.get(by), stage), [start, end])
+            span[0], span[1] = min(span[0], start), max(span[1], end)
+    for (value, stage), (start, end) in spans.items():
+        groups[value]["wall_seconds"][stage] = round(end - start, 4)
+    return groups
+
+
+def report(**extra):
+    """The run report: totals plus the same figures per set and per host."""
+    finished = time.time()
+    return dict({
+        "started_at": round(_started, 3),
+        "finished_at": round(finished, 3),
+        "duration_seconds": round(finished - _started, 3),
+        "totals": _group(None).get(None, _empty_group()),
+        "sets": dict(sorted(_group("set").items())),
+        "hosts": dict(sorted(_group("host").items())),
+    }, **extra)
+
+
+def _atomic_write(path, text):
+    tmp_filename = f"{path}.tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_filename, path)
+
+
+def write_report(path=REPORT_FILENAME, **extra):
+    _atomic_write(path, json.dumps(report(**extra), ensure_ascii=False, indent=4))
+    return path
+
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+
+def prometheus_text():
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        timers = sorted(_timers.items())
+    names = sorted({name for (name, _), _ in counters})
+    for name in names:
+        metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{_prometheus_labels(labels)} {value}"
+                     for (counter_name, labels), value in counters if counter_name == name)
+    if timers:
+        # Per-call time summed over threads, calls, and the stage's wall-clock span
+        for metric, kind, value in (
+                (f"{PROMETHEUS_PREFIX}_stage_thread_seconds_total", "counter", lambda timer: timer[1]),
+                (f"{PROMETHEUS_PREFIX}_stage_calls_total", "counter", lambda timer: timer[0]),
+                (f"{PROMETHEUS_PREFIX}_stage_wall_seconds", "gauge", lambda timer: round(timer[3] - timer[2], 6))):
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.extend(f"{metric}{_prometheus_labels((('stage', stage),) + labels)} {value(timer)}"
+                         for (stage, labels), timer in timers)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    """Write the samples in the Prometheus text format, e.g. for the node_exporter textfile collector."""
+    _atomic_write(path, prometheus_text())
+    return path
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import data_scraper
+import metrics
+import rate_limiter
+
+# State of the current worker process, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(args, limiter):
+    card_index, crawl_state = data_scraper.configure(args, limiter, worker=True)
+    _worker.update(args=args, card_index=card_index, crawl_state=crawl_state)
+
+
+def _scrape_set(key, url):
+    """Scrape one set in a worker and hand back what the parent has to persist."""
+    args = _worker["args"]
+    card_index = _worker["card_index"]
+    crawl_state = _worker["crawl_state"]
+    print(f"Scraping data for {key}...")
+    try:
+        with metrics.set_scope(key):
+            csv_filename = data_scraper.scrape_website(url, key, args.workers, args.set_listing,
+                                                       args.resume, crawl_state, args.incremental, args.jsonl)
+    except Exception as e:
+        print(f"[{key}] Scraping failed: {e}")
+        csv_filename = None
+
+    result = {"key": key, "csv": csv_filename, "crawl_state": crawl_state.updates(), "cards": {}, "hits": 0, "misses": 0,
+              "metrics": metrics.take()}
+    if card_index is not None:
+        result.update(cards=card_index.take_added(), hits=card_index.hits, misses=card_index.misses)
+        card_index.reset_stats()
+    return result
+
+
+def run(sets, args, card_index=None, crawl_state=None):
+    """Scrape every {key: url} in sets across args.jobs processes and return {key: csv_filename or None}.
+
+    All workers draw from one shared token bucket per host, so together they
+    stay within the --rate limits. Card index additions, crawl state updates and
+    metrics are merged back here, so only this process writes those files.
+    """
+    start_time = time.time()
+    limiter = rate_limiter.RateLimiter(dict(args.rate), args.default_rate, shared=True)
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(args, limiter)) as executor:
+        futures = [executor.submit(_scrape_set, key, url) for key, url in sets.items()]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["key"]] = result["csv"]
+            metrics.merge(result["metrics"])
+            if card_index is not None:
+                card_index.merge(result["cards"])
+                card_index.hits += result["hits"]
+                card_index.misses += result["misses"]
+                card_index.save()
+            if crawl_state:
+                for key, signature in result["crawl_state"].items():
+                    crawl_state.update(key, signature)
+
+    print(f"Scraped {sum(1 for csv_filename in results.values() if csv_filename)} of {len(sets)} sets "
+          f"with {args.jobs} processes in {time.time() - start_time:.2f} seconds.")
+    return {key: results.get(key) for key in sets}
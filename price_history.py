@@ -0,0 +1,186 @@
+import argparse
+import csv
+import glob
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+PRICE_HISTORY_FILENAME = "price_history.sqlite3"
+
+SCHEMA = """
+-- One row per card only when its yen price differs from the previous observation
+CREATE TABLE IF NOT EXISTS prices (
+    set_key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    price_yen INTEGER NOT NULL,
+    PRIMARY KEY (set_key, id, observed_at)
+);
+CREATE INDEX IF NOT EXISTS prices_id ON prices (id);
+-- One row per set and scrape run, so unchanged runs still show up
+CREATE TABLE IF NOT EXISTS runs (
+    set_key TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    cards INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    PRIMARY KEY (set_key, observed_at)
+);
+-- When each card's price was last fetched, changed or not
+CREATE TABLE IF NOT EXISTS checks (
+    set_key TEXT NOT NULL,
+    id TEXT NOT NULL,
+    checked_at TEXT NOT NULL,
+    PRIMARY KEY (set_key, id)
+);
+"""
+
+
+def timestamp(seconds=None):
+    """UTC ISO 8601 timestamp, which sorts in time order as text."""
+    moment = datetime.fromtimestamp(time.time() if seconds is None else seconds, timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# Read {card id: yen price} from a set CSV, -1 where the price could not be found
+def read_csv_prices(csv_filename):
+    prices = {}
+    with open(csv_filename, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                prices[row["Id"]] = int(float(row["Price (Yen)"]))
+            except (KeyError, ValueError):
+                continue
+    return prices
+
+
+class PriceHistory:
+    """Yen price of every card over time, storing only the observations that changed it."""
+
+    def __init__(self, path=PRICE_HISTORY_FILENAME):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def latest_prices(self, set_key, until=None):
+        """{card id: price} of a set as of the given timestamp (default: the latest observation)."""
+        until = until or "9999"
+        rows = self._conn.execute(
+            "SELECT id, price_yen FROM prices p WHERE set_key = ? AND observed_at = ("
+            " SELECT MAX(observed_at) FROM prices q"
+            " WHERE q.set_key = p.set_key AND q.id = p.id AND q.observed_at <= ?)",
+            (set_key, until))
+        return dict(rows.fetchall())
+
+    def record(self, set_key, prices, observed_at=None):
+        """Record one scrape of a set given as {card id: price}; returns how many prices changed.
+
+        Prices that were not found (-1) only count as a check of the card.
+        """
+        observed_at = observed_at or timestamp()
+        previous = self.latest_prices(set_key, observed_at)
+        changed = [(set_key, card_id, observed_at, price) for card_id, price in prices.items()
+                   if price >= 0 and previous.get(card_id) != price]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)", changed)
+            self._conn.executemany("INSERT OR REPLACE INTO checks VALUES (?, ?, ?)",
+                                   [(set_key, card_id, observed_at) for card_id in prices])
+            self._conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)",
+                               (set_key, observed_at, len(prices), len(changed)))
+        return len(changed)
+
+    def record_csv(self, set_key, csv_filename, observed_at=None):
+        return self.record(set_key, read_csv_prices(csv_filename), observed_at)
+
+    def runs(self, set_key):
+        """Timestamps of the recorded scrapes of a set, oldest first."""
+        rows = self._conn.execute("SELECT observed_at FROM runs WHERE set_key = ? ORDER BY observed_at", (set_key,))
+        return [observed_at for observed_at, in rows]
+
+    def sets(self):
+        return [set_key for set_key, in self._conn.execute("SELECT DISTINCT set_key FROM runs ORDER BY set_key")]
+
+    def last_checked(self, set_key):
+        """{card id: timestamp of its last price check} for a set."""
+        return dict(self._conn.execute("SELECT id, checked_at FROM checks WHERE set_key = ?", (set_key,)).fetchall())
+
+    def change_counts(self, set_key, since):
+        """{card id: number of price changes recorded after the given timestamp} for a set."""
+        rows = self._conn.execute("SELECT id, COUNT(*) FROM prices WHERE set_key = ? AND observed_at > ? GROUP BY id",
+                                  (set_key, since))
+        return dict(rows.fetchall())
+
+    def history(self, card_id, set_key=None):
+        """[(set, observed_at, price)] for a card id, oldest first."""
+        query = "SELECT set_key, observed_at, price_yen FROM prices WHERE id = ?"
+        params = [card_id]
+        if set_key:
+            query += " AND set_key = ?"
+            params.append(set_key)
+        return self._conn.execute(query + " ORDER BY set_key, observed_at", params).fetchall()
+
+    def movers(self, set_key, since=None, until=None):
+        """[(card id, old price, new price)] for cards whose price differs between two runs, largest move first.
+
+        The runs default to the last two recorded for the set.
+        """
+        if since is None:
+            runs = [run for run in self.runs(set_key) if until is None or run <= until]
+            if len(runs) < 2:
+                return []
+            since = runs[-2]
+        old = self.latest_prices(set_key, since)
+        new = self.latest_prices(set_key, until)
+        moved = [(card_id, old[card_id], price) for card_id, price in new.items()
+                 if card_id in old and old[card_id] != price]
+        return sorted(moved, key=lambda move: (-abs(move[2] - move[1]), move[0]))
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query and fill the price history of scraped sets.")
+    parser.add_argument("--db", default=PRICE_HISTORY_FILENAME, help="Path of the price history database.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Record the prices of existing set CSVs, e.g. historical_csv/.")
+    import_parser.add_argument("paths", nargs="+", help="Set CSVs or directories of them.")
+    import_parser.add_argument("--at", help="Timestamp of the observation (default: each file's modification time).")
+
+    history_parser = subparsers.add_parser("history", help="Show how the price of a card changed.")
+    history_parser.add_argument("card_id")
+    history_parser.add_argument("--set", dest="set_key")
+
+    movers_parser = subparsers.add_parser("movers", help="Show the price changes of a set between two runs.")
+    movers_parser.add_argument("set_key", nargs="?", help="Set key (default: every set).")
+    movers_parser.add_argument("--since", help="Timestamp of the earlier run (default: the second to last run).")
+    movers_parser.add_argument("--until", help="Timestamp of the later run (default: the last run).")
+    movers_parser.add_argument("--limit", type=int, default=20, help="Moves shown per set.")
+    args = parser.parse_args()
+
+    history = PriceHistory(args.db)
+    if args.command == "import":
+        csv_filenames = []
+        for path in args.paths:
+            csv_filenames.extend(sorted(glob.glob(os.path.join(path, "*.csv"))) if os.path.isdir(path) else [path])
+        for csv_filename in csv_filenames:
+            set_key = os.path.splitext(os.path.basename(csv_filename))[0]
+            changed = history.record_csv(set_key, csv_filename, args.at or timestamp(os.path.getmtime(csv_filename)))
+            print(f"{set_key}: {changed} price changes recorded.")
+    elif args.command == "history":
+        rows = history.history(args.card_id, args.set_key)
+        if not rows:
+            print(f"No price history for {args.card_id}.", file=sys.stderr)
+        for set_key, observed_at, price in rows:
+            print(f"{set_key}\t{observed_at}\t{price}")
+    else:
+        for set_key in [args.set_key] if args.set_key else history.sets():
+            moves = history.movers(set_key, args.since, args.until)
+            if not moves:
+                continue
+            print(f"{set_key}: {len(moves)} price changes")
+            for card_id, old, new in moves[:args.limit]:
+                print(f"  {card_id:<16}{old:>8} -> {new:<8}{new - old:+}")
+    history.close()
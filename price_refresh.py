@@ -0,0 +1,237 @@
+import csv
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import data_scraper
+import http_client
+from card_ids import normalize_card_id
+from card_index import TRANSIENT_RESULTS
+from catalog_db import find_set_csvs
+from price_history import PriceHistory, timestamp
+from pricing import RateTable, convert_price
+from row_writer import CsvSink, JsonLinesSink, RowWriter
+
+DEFAULT_BUDGET = data_scraper.REFRESH_BUDGET
+# Columns the scraper writes as whole numbers; every other "Price (...)" column is a converted price
+INTEGER_COLUMNS = {"No", "Price (Yen)", "Qty"}
+# Price changes within this window count towards a card's volatility
+VOLATILITY_WINDOW = 30 * 24 * 3600
+MAX_VOLATILITY = 5
+# Share of the budget plan_refresh holds back for ids their search does not list
+FALLBACK_RESERVE = 0.25
+# Beyond this many days since its last check a card gets no more urgent
+MAX_AGE_DAYS = 7
+# The first entry contained in a rarity decides its tier
+RARITY_TIERS = [
+    ("Over Rare", 3), ("Secret", 3), ("Treasure", 3), ("MAX", 3), ("Max", 3), ("Master", 3),
+    ("Dream", 3), ("Premium", 3), ("Victory", 2), ("Hero", 2), ("Super Rare", 2),
+    ("Very Rare", 1), ("Rare", 1),
+]
+
+
+def rarity_tier(rarity):
+    for text, tier in RARITY_TIERS:
+        if text in rarity:
+            return tier
+    return 0
+
+
+def parse_timestamp(text):
+    return datetime.strptime(text, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+
+
+def refresh_priority(price, rarity, changes, hours_since_check):
+    """Higher for expensive, volatile, high-rarity cards that were not checked for a while.
+
+    Price counts by order of magnitude (¥100 -> 2, ¥10,000 -> 4), each recent
+    price change adds one (up to MAX_VOLATILITY), the rarity tier adds up to
+    three and every day since the last check adds one (up to MAX_AGE_DAYS).
+    """
+    level = math.log10(price + 1) if price > 0 else 0
+    return level + min(changes, MAX_VOLATILITY) + rarity_tier(rarity) + min(hours_since_check / 24, MAX_AGE_DAYS)
+
+
+def csv_price(row):
+    try:
+        return int(float(row["Price (Yen)"]))
+    except (TypeError, ValueError):
+        return -1
+
+
+def read_set_rows(csv_filename):
+    with open(csv_filename, "r", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+# (priority, set key, row, search term) for every card of the given sets that can be priced
+def load_candidates(set_rows, history, now=None):
+    now = now or time.time()
+    since = timestamp(now - VOLATILITY_WINDOW)
+    candidates = []
+    # Japanese name -> its yuyu-tei search term, worked out once per name
+    search_terms = {}
+    for key, rows in set_rows.items():
+        checked = history.last_checked(key)
+        changes = history.change_counts(key, since)
+        seen = set()
+        for row in rows:
+            if not row["Id"] or not row["Japanese Name"] or row["Japanese Name"] in TRANSIENT_RESULTS:
+                continue
+            # A card listed twice in a set is priced once
+            if row["Id"] in seen:
+                continue
+            seen.add(row["Id"])
+            hours = (now - parse_timestamp(checked[row["Id"]])) / 3600 if row["Id"] in checked else math.inf
+            priority = refresh_priority(csv_price(row), row["Rarity"], changes.get(row["Id"], 0), hours)
+            name = row["Japanese Name"]
+            if name not in search_terms:
+                search_terms[name] = data_scraper.find_consecutive_japanese(name)
+            candidates.append((priority, key, row, search_terms[name]))
+    return candidates
+
+
+def plan_refresh(candidates, budget=DEFAULT_BUDGET):
+    """Cards to re-price as [(set key, row, search term)], highest priority first.
+
+    One yuyu-tei search answers every card sharing a name prefix, so planning
+    counts distinct searches: once they are spent, cards whose search is
+    already planned still come along for free. Ids a search does not list cost
+    one more request each, so FALLBACK_RESERVE of the budget is not spent on
+    searches and is left for those lookups.
+    """
+    max_searches = max(1, budget - int(budget * FALLBACK_RESERVE)) if budget > 0 else 0
+    search_terms = set()
+    planned = []
+    for _, key, row, search_term in sorted(candidates, key=lambda candidate: -candidate[0]):
+        if search_term not in search_terms:
+            if len(search_terms) >= max_searches:
+                continue
+            search_terms.add(search_term)
+        planned.append((key, row, search_term))
+    return planned
+
+
+# {card id: price} listed by a yuyu-tei search, None if it failed or the budget ran out first
+def _search(resolver, search_term):
+    try:
+        return resolver.price_map(search_term)
+    except Exception as e:
+        print(f"Error searching yuyu-tei for {search_term}: {e}")
+        return None
+
+
+# The price of a card its search did not list, -1 if it could not be fetched
+def _lookup(resolver, key, row, search_term):
+    try:
+        price = resolver.fetch_single(row["Japanese Name"], row["Id"], search_term)
+    except Exception as e:
+        print(f"[{key}] Error fetching the price of {row['Id']}: {e}")
+        return -1
+    return -1 if price is None else price
+
+
+# CSV text back to the value the scraper wrote, so the JSON Lines copy keeps its numbers
+def csv_value(column, text):
+    if column in INTEGER_COLUMNS or column.startswith("Price ("):
+        try:
+            number = float(text)
+        except (TypeError, ValueError):
+            return text
+        return int(number) if column in INTEGER_COLUMNS or number == -1 else number
+    return text
+
+
+# Rewrite a set with its refreshed prices, converted with today's rates. Every other column,
+# Qty and any extra currency added by pricing.py included, is kept; cards that were not
+# refreshed or not found keep their old prices.
+def write_repriced_set(key, rows, prices, jsonl=True):
+    header = [column for column in rows[0] if column is not None]
+    rates = RateTable().rates_on()
+    currencies = {column: column[len("Price ("):-1] for column in header
+                  if column.startswith("Price (") and column != "Price (Yen)"}
+
+    csv_filename = data_scraper.set_csv_filename(key)
+    os.makedirs(os.path.dirname(csv_filename), exist_ok=True)
+    sinks = [CsvSink(csv_filename, header)]
+    if jsonl:
+        sinks.append(JsonLinesSink(data_scraper.set_jsonl_filename(key), header))
+    with RowWriter(sinks) as writer:
+        for row in rows:
+            record = {column: csv_value(column, row[column]) for column in header}
+            price = prices.get(row["Id"])
+            if price is not None and price >= 0:
+                record["Price (Yen)"] = price
+                for column, currency in currencies.items():
+                    # Only currencies without any recorded rate keep their old value
+                    if currency in rates:
+                        record[column] = convert_price(price, rates[currency])
+            writer.write([record[column] for column in header])
+    return writer.count
+
+
+def refresh_prices(sources, history, budget=DEFAULT_BUDGET, workers=http_client.DEFAULT_WORKERS, jsonl=True):
+    """Re-price the most urgent cards of {set key: CSV path} and return {set key: (checked, changed)}."""
+    set_rows = {key: read_set_rows(csv_filename) for key, csv_filename in sources.items()}
+    planned = plan_refresh(load_candidates(set_rows, history), budget)
+
+    # Cached search pages are revalidated, a fresh cache entry must not hide a new price
+    resolver = data_scraper.PriceResolver(revalidate=True, max_requests=budget)
+    search_terms = list(dict.fromkeys(search_term for _, _, search_term in planned))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Every planned search first, in priority order, so lookups cannot take their requests
+        price_maps = dict(zip(search_terms, executor.map(lambda term: _search(resolver, term), search_terms)))
+        prices = []
+        misses = []
+        for i, (key, row, search_term) in enumerate(planned):
+            price_map = price_maps[search_term]
+            card_id = normalize_card_id(row["Id"])
+            if price_map is not None and card_id in price_map:
+                prices.append(price_map[card_id])
+            else:
+                prices.append(-1)
+                if price_map is not None:
+                    misses.append(i)
+        # Then whatever the searches left of the budget, on the most urgent ids they did not list
+        lookups = misses[:max(0, budget - resolver.searches)]
+        for i, price in zip(lookups, executor.map(lambda i: _lookup(resolver, *planned[i]), lookups)):
+            prices[i] = price
+
+    # Every planned card counts as checked; those left at -1 wait a full cycle for their next turn
+    refreshed = {}
+    for (key, row, _), price in zip(planned, prices):
+        refreshed.setdefault(key, {})[row["Id"]] = price
+
+    observed_at = timestamp()
+    summary = {}
+    for key, set_prices in refreshed.items():
+        old_prices = {row["Id"]: csv_price(row) for row in set_rows[key]}
+        if any(price >= 0 and price != old_prices.get(card_id) for card_id, price in set_prices.items()):
+            write_repriced_set(key, set_rows[key], set_prices, jsonl)
+        summary[key] = (len(set_prices), history.record(key, set_prices, observed_at))
+    print(f"{sum(price >= 0 for price in prices)} of {len(planned)} planned cards re-priced with "
+          f"{resolver.searches} searches and {resolver.fallbacks} single-card lookups (budget {budget}).")
+    return summary
+
+
+def run(prefix=None, budget=DEFAULT_BUDGET, workers=http_client.DEFAULT_WORKERS,
+        price_history=None, jsonl=True):
+    start_time = time.time()
+    sources = find_set_csvs()
+    if prefix:
+        sources = {key: csv_filename for key, csv_filename in sources.items() if key.startswith(prefix.upper())}
+    if not sources:
+        print("No set CSVs found to refresh.")
+        return {}
+
+    history = PriceHistory(price_history) if price_history else PriceHistory()
+    try:
+        summary = refresh_prices(sources, history, budget, workers, jsonl)
+    finally:
+        history.close()
+    for key, (checked, changed) in sorted(summary.items()):
+        print(f"{key}: {checked} prices checked, {changed} changed.")
+    print(f"Price refresh completed in {time.time() - start_time:.2f} seconds.")
+    return summary
@@ -0,0 +1,166 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from datetime import date
+
+RATES_FILENAME = "exchange_rates.json"
+# Yen -> currency rates used for anything the rate table does not list
+DEFAULT_RATES = {"SGD": 0.0087}
+# Price of a card that could not be found; it is kept as is in every currency
+NOT_FOUND = -1
+YEN_COLUMN = "Price (Yen)"
+
+
+def price_column(currency):
+    return f"Price ({currency})"
+
+
+class RateTable:
+    """Yen exchange rates by date, stored as {"YYYY-MM-DD": {"SGD": 0.0087, ...}} in a JSON file."""
+
+    def __init__(self, path=RATES_FILENAME):
+        self.path = path
+        self.rates = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.rates = json.load(f)
+
+    def rates_on(self, day=None):
+        """Every known rate as of the given ISO date (default: today), newer entries winning."""
+        day = day or date.today().isoformat()
+        rates = dict(DEFAULT_RATES)
+        for entry_day in sorted(self.rates):
+            if entry_day <= day:
+                rates.update(self.rates[entry_day])
+        return rates
+
+    def rate(self, currency, day=None):
+        rates = self.rates_on(day)
+        if currency not in rates:
+            raise KeyError(f"No JPY -> {currency} rate in {self.path}")
+        return rates[currency]
+
+    def set_rate(self, currency, rate, day=None):
+        self.rates.setdefault(day or date.today().isoformat(), {})[currency] = rate
+        tmp_filename = f"{self.path}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(self.rates.items())), f, indent=4)
+        os.replace(tmp_filename, self.path)
+
+
+# Convert one yen price, e.g. while a row is being written
+def convert_price(yen, rate):
+    return round(yen * rate, 2) if yen > NOT_FOUND else yen
+
+
+def convert_prices(yen_prices, rate):
+    """Convert a whole column of yen prices, keeping NOT_FOUND.
+
+    Card prices repeat a lot, so each distinct price is converted once with
+    convert_price and looked up for every row. This stays in plain Python:
+    round() is what keeps bulk and per-row prices identical, and a whole
+    catalog only has a few hundred distinct prices.
+    """
+    converted = {yen: convert_price(yen, rate) for yen in set(yen_prices)}
+    return [converted[yen] for yen in yen_prices]
+
+
+def parse_yen(text):
+    try:
+        return int(float(text))
+    except (TypeError, ValueError):
+        return NOT_FOUND
+
+
+def _format_price(value):
+    # Whole yen stay integers, as in the scraped files
+    return int(value) if value == NOT_FOUND else value
+
+
+def reprice_csvs(csv_filenames, currencies, rate_table=None, day=None):
+    """Rewrite the price columns of set CSVs in place from their yen prices.
+
+    All files are converted as one column per currency. Existing columns such
+    as "Price (SGD)" are updated and other currencies are appended at the end,
+    so the standard columns keep their position. Returns the number of rows.
+    """
+    rate_table = rate_table or RateTable()
+    rates = {currency: rate_table.rate(currency, day) for currency in currencies}
+
+    tables = []
+    for csv_filename in csv_filenames:
+        with open(csv_filename, "r", newline="", encoding="utf-8") as f:
+            text = f.read()
+        rows = list(csv.reader(text.splitlines(keepends=True)))
+        if rows and YEN_COLUMN in rows[0]:
+            # Files keep their line endings, so a re-priced file only differs in its prices
+            line_end = "\r\n" if "\r\n" in text[:text.find("\n") + 1] else "\n"
+            tables.append((csv_filename, line_end, rows[0], rows[1:]))
+
+    yen_prices = [parse_yen(row[header.index(YEN_COLUMN)]) for _, _, header, rows in tables for row in rows]
+    columns = {currency: convert_prices(yen_prices, rate) for currency, rate in rates.items()}
+
+    start = 0
+    for csv_filename, line_end, header, rows in tables:
+        for currency, converted in columns.items():
+            if price_column(currency) not in header:
+                header.append(price_column(currency))
+            index = header.index(price_column(currency))
+            for row, value in zip(rows, converted[start:start + len(rows)]):
+                row.extend([""] * (len(header) - len(row)))
+                row[index] = _format_price(value)
+        start += len(rows)
+
+        tmp_filename = f"{csv_filename}.tmp"
+        with open(tmp_filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator=line_end)
+            writer.writerow(header)
+            writer.writerows(rows)
+        os.replace(tmp_filename, csv_filename)
+    return len(yen_prices)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Manage yen exchange rates in {RATES_FILENAME} and re-price set CSVs.")
+    parser.add_argument("--rates", default=RATES_FILENAME, help="Path of the rate table.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    set_parser = subparsers.add_parser("set-rate", help="Record the JPY -> CURRENCY rate for a date.")
+    set_parser.add_argument("currency")
+    set_parser.add_argument("rate", type=float)
+    set_parser.add_argument("--date", help="ISO date of the rate (default: today).")
+
+    show_parser = subparsers.add_parser("show", help="Print the rates in effect on a date.")
+    show_parser.add_argument("--date", help="ISO date (default: today).")
+
+    reprice_parser = subparsers.add_parser("reprice", help="Recompute the price columns of set CSVs in place.")
+    reprice_parser.add_argument("paths", nargs="+", help="Set CSVs or directories of them, e.g. historical_csv.")
+    reprice_parser.add_argument("--currency", dest="currencies", action="append",
+                                help="Currency to write (repeatable, default: SGD).")
+    reprice_parser.add_argument("--date", help="Use the rates in effect on this ISO date (default: today).")
+    args = parser.parse_args()
+
+    rate_table = RateTable(args.rates)
+    if args.command == "set-rate":
+        rate_table.set_rate(args.currency.upper(), args.rate, args.date)
+        print(f"JPY -> {args.currency.upper()} set to {args.rate} from {args.date or date.today().isoformat()}.")
+    elif args.command == "show":
+        for currency, rate in sorted(rate_table.rates_on(args.date).items()):
+            print(f"{currency}\t{rate}")
+    else:
+        start_time = time.time()
+        csv_filenames = []
+        for path in args.paths:
+            csv_filenames.extend(sorted(glob.glob(os.path.join(path, "*.csv"))) if os.path.isdir(path) else [path])
+        currencies = [currency.upper() for currency in args.currencies or ["SGD"]]
+        known = rate_table.rates_on(args.date)
+        unknown = [currency for currency in currencies if currency not in known]
+        if unknown:
+            parser.error(f"No JPY -> {', '.join(unknown)} rate in {args.rates} as of {args.date or 'today'}; "
+                         f"record one with set-rate first.")
+        rows = reprice_csvs(csv_filenames, currencies, rate_table, args.date)
+        print(f"Re-priced {rows} rows in {len(csv_filenames)} files to {', '.join(currencies)} "
+              f"in {time.time() - start_time:.2f} seconds.")
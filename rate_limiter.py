@@ -0,0 +1,156 @@
+import multiprocessing
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Sustained requests per second allowed against each host
+HOST_RATES = {
+    "duelmasters.fandom.com": 4.0,
+    "yuyu-tei.jp": 2.0,
+}
+DEFAULT_RATE = 2.0
+DEFAULT_MAX_RETRIES = 5
+# Exponential backoff between retries starts at BACKOFF_BASE seconds and never exceeds BACKOFF_CAP
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate backs off when the host pushes back.
+
+    Each 429 halves the rate (down to a tenth of the configured one); every
+    successful response wins back a small share until the configured rate is reached.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self):
+        with self._lock:
+            self.rate = max(self.max_rate / 10, self.rate / 2)
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class SharedTokenBucket:
+    """TokenBucket kept in shared memory, so worker processes draw from one budget.
+
+    It must be created in the parent process and handed to the workers when they
+    start (e.g. through a ProcessPoolExecutor initializer).
+    """
+
+    def __init__(self, rate, burst=None, context=None):
+        context = context or multiprocessing.get_context()
+        self.max_rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        # rate, tokens, last update; time.monotonic() is system-wide, so it is shared too
+        self._state = context.Array("d", [self.max_rate, self.burst, time.monotonic()])
+
+    @property
+    def rate(self):
+        return self._state[0]
+
+    def acquire(self):
+        while True:
+            with self._state.get_lock():
+                rate, tokens, updated = self._state[:]
+                now = time.monotonic()
+                tokens = min(self.burst, tokens + (now - updated) * rate)
+                if tokens >= 1:
+                    self._state[1:] = [tokens - 1, now]
+                    return
+                self._state[1:] = [tokens, now]
+                wait = (1 - tokens) / rate
+            time.sleep(wait)
+
+    def penalize(self):
+        with self._state.get_lock():
+            self._state[0] = max(self.max_rate / 10, self._state[0] / 2)
+
+    def reward(self):
+        with self._state.get_lock():
+            self._state[0] = min(self.max_rate, self._state[0] + self.max_rate / 20)
+
+
+class RateLimiter:
+    """One TokenBucket per host, created on first use.
+
+    With shared=True the configured hosts get SharedTokenBucket instances, and
+    the limiter can be passed to worker processes that then share those budgets.
+    """
+
+    def __init__(self, host_rates=None, default_rate=DEFAULT_RATE, shared=False, context=None):
+        self.host_rates = dict(HOST_RATES, **(host_rates or {}))
+        self.default_rate = default_rate
+        self._buckets = {}
+        self._lock = threading.Lock()
+        if shared:
+            self._buckets = {host: SharedTokenBucket(rate, context=context) for host, rate in self.host_rates.items()}
+
+    def __getstate__(self):
+        # Only shared buckets survive the trip to a worker process
+        state = dict(self.__dict__)
+        state["_buckets"] = {host: bucket for host, bucket in self._buckets.items() if isinstance(bucket, SharedTokenBucket)}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.host_rates.get(host, self.default_rate))
+            return bucket
+
+    def acquire(self, host):
+        self.bucket(host).acquire()
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff for the given retry attempt (starting at 0)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_seconds(value):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_host_rate(text):
+    """Parse a HOST=REQUESTS_PER_SECOND command-line value."""
+    host, _, rate = text.partition("=")
+    if not host or not rate:
+        raise ValueError(f"Expected HOST=REQUESTS_PER_SECOND, got {text!r}")
+    return host, float(rate)
@@ -0,0 +1,69 @@
+import csv
+import json
+import os
+
+
+class CsvSink:
+    def __init__(self, path, header):
+        self.path = path
+        self._file = open(f"{path}.part", mode='w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(header)
+
+    def write(self, record):
+        self._writer.writerow(record)
+        self._file.flush()
+
+    def close(self, commit):
+        self._file.close()
+        if commit:
+            os.replace(f"{self.path}.part", self.path)
+        else:
+            os.remove(f"{self.path}.part")
+
+
+class JsonLinesSink:
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self._file = open(f"{path}.part", mode='w', encoding='utf-8')
+
+    def write(self, record):
+        self._file.write(json.dumps(dict(zip(self.header, record)), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self, commit):
+        self._file.close()
+        if commit:
+            os.replace(f"{self.path}.part", self.path)
+        else:
+            os.remove(f"{self.path}.part")
+
+
+class RowWriter:
+    """Write records to every sink as soon as they arrive.
+
+    Each sink writes to <path>.part, flushing after every record so the file can
+    be tailed while a set is running. close(commit=True) renames the parts over
+    the final files, so a crash never leaves a truncated output behind.
+    """
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+        self.count = 0
+
+    def write(self, record):
+        self.count += 1
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self, commit=True):
+        for sink in self.sinks:
+            sink.close(commit)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Only a run that finished and produced rows replaces the previous output
+        self.close(commit=exc_type is None and self.count > 0)
@@ -0,0 +1,269 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from card_ids import normalize_card_id
+from catalog_db import COLUMNS, SOURCE_DIRS, catalog_row, find_set_csvs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8700
+# Seconds between checks of the source directories for regenerated CSVs
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_LIMIT = 50
+
+
+class CardRecord:
+    """One catalog row (the COLUMNS of catalog_db) plus its names folded for matching."""
+
+    __slots__ = COLUMNS + ("folded_names",)
+
+    def __init__(self, values):
+        for column, value in zip(COLUMNS, values):
+            setattr(self, column, value)
+        self.folded_names = (fold(self.japanese_name), fold(self.english_name))
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in COLUMNS}
+
+
+# Fullwidth and halfwidth forms, case and surrounding spaces do not matter when matching names
+def fold(text):
+    return unicodedata.normalize("NFKC", text or "").casefold().strip()
+
+
+# Every character and pair of adjacent characters of text
+def ngrams(text):
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _sort_key(record):
+    return (-(record.price_yen if record.price_yen is not None else -1), record.set_key, record.no or 0)
+
+
+class SearchIndex:
+    """Every row of the per-set CSVs in memory, with hash indexes to answer queries without scanning.
+
+    Names are indexed by their characters and character pairs; a query looks
+    up the rarest of its own n-grams first and only checks the few rows
+    that contain all of them. Card ids (normalized as in card_ids), sets,
+    colours and rarities have an index each. refresh() reloads only the sets
+    whose CSV changed on disk.
+    """
+
+    def __init__(self, directories=SOURCE_DIRS):
+        self.directories = directories
+        self._lock = threading.Lock()
+        self._records = {}
+        self._next_rid = 0
+        # set key -> (path, mtime_ns, size) the rows were read from
+        self._sources = {}
+        self._by_ngram = {}
+        self._by_id = {}
+        self._by_set = {}
+        self._by_civilization = {}
+        self._by_rarity = {}
+
+    def _postings(self, record):
+        yield self._by_id, normalize_card_id(record.id)
+        yield self._by_set, record.set_key
+        yield self._by_rarity, record.rarity
+        for civilization in (record.civilization or "").split("/"):
+            if civilization.strip():
+                yield self._by_civilization, civilization.strip()
+        for ngram in ngrams(record.folded_names[0]) | ngrams(record.folded_names[1]):
+            yield self._by_ngram, ngram
+
+    def _remove_set(self, set_key):
+        for rid in self._by_set.get(set_key, set()).copy():
+            record = self._records.pop(rid)
+            for index, key in self._postings(record):
+                rids = index[key]
+                rids.discard(rid)
+                if not rids:
+                    del index[key]
+        self._sources.pop(set_key, None)
+
+    def _load_set(self, set_key, records, source):
+        self._remove_set(set_key)
+        for record in records:
+            rid = self._next_rid
+            self._next_rid += 1
+            self._records[rid] = record
+            for index, key in self._postings(record):
+                index.setdefault(key, set()).add(rid)
+        self._sources[set_key] = source
+
+    def refresh(self):
+        """Load new and changed sets and drop sets whose CSV is gone. Returns (updated, removed) keys."""
+        sources = {}
+        for set_key, csv_filename in find_set_csvs(self.directories).items():
+            try:
+                stat = os.stat(csv_filename)
+            except FileNotFoundError:
+                continue
+            sources[set_key] = (csv_filename, stat.st_mtime_ns, stat.st_size)
+
+        changed = {set_key: source for set_key, source in sources.items() if self._sources.get(set_key) != source}
+        # Files are read outside the lock, so queries keep being answered meanwhile
+        loaded = {}
+        for set_key, source in changed.items():
+            try:
+                with open(source[0], "r", newline="", encoding="utf-8") as f:
+                    loaded[set_key] = [CardRecord(catalog_row(set_key, row)) for row in csv.DictReader(f)]
+            except (OSError, KeyError) as e:
+                print(f"Could not load {source[0]}: {e}")
+
+        with self._lock:
+            removed = sorted(set(self._sources) - set(sources))
+            for set_key in removed:
+                self._remove_set(set_key)
+            for set_key, records in loaded.items():
+                self._load_set(set_key, records, changed[set_key])
+        return sorted(loaded), removed
+
+    def search(self, text=None, prefix=False, card_id=None, set_key=None, civilization=None, rarity=None,
+               min_price=None, max_price=None, limit=DEFAULT_LIMIT):
+        """(number of matches, up to limit matching records, most expensive first).
+
+        text matches part of the Japanese or English name, or the start of
+        either with prefix=True. All given criteria must match.
+        """
+        folded = fold(text)
+        with self._lock:
+            candidates = []
+            if folded:
+                candidates.extend(self._by_ngram.get(ngram, set()) for ngram in ngrams(folded))
+            if card_id:
+                candidates.append(self._by_id.get(normalize_card_id(card_id), set()))
+            for index, key in ((self._by_set, set_key), (self._by_civilization, civilization), (self._by_rarity, rarity)):
+                if key:
+                    candidates.append(index.get(key, set()))
+
+            if candidates:
+                candidates.sort(key=len)
+                rids = candidates[0].intersection(*candidates[1:])
+                records = [self._records[rid] for rid in rids]
+            else:
+                records = list(self._records.values())
+
+        matches = [record for record in records
+                   if (not folded or any(name.startswith(folded) if prefix else folded in name
+                                         for name in record.folded_names))
+                   and (min_price is None or (record.price_yen is not None and record.price_yen >= min_price))
+                   and (max_price is None or (record.price_yen is not None and record.price_yen <= max_price))]
+        return len(matches), heapq.nsmallest(limit, matches, key=_sort_key)
+
+    def stats(self):
+        with self._lock:
+            return {"sets": len(self._sources), "cards": len(self._records), "ngrams": len(self._by_ngram)}
+
+
+# Parse the query string of a /search request into SearchIndex.search arguments
+def search_arguments(query):
+    def value(name):
+        return query.get(name, [None])[-1] or None
+
+    def number(name):
+        text = value(name)
+        return int(text) if text is not None else None
+
+    match = value("match") or "substring"
+    if match not in ("substring", "prefix"):
+        raise ValueError("match must be substring or prefix")
+    limit = number("limit")
+    return {
+        "text": value("q"),
+        "prefix": match == "prefix",
+        "card_id": value("id"),
+        "set_key": value("set"),
+        "civilization": value("civilization"),
+        "rarity": value("rarity"),
+        "min_price": number("min_price"),
+        "max_price": number("max_price"),
+        "limit": max(0, limit) if limit is not None else DEFAULT_LIMIT,
+    }
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    """GET /search?q=&match=substring|prefix&id=&set=&civilization=&rarity=&min_price=&max_price=&limit=
+    and GET /stats, answered as JSON."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        index = self.server.index
+        if url.path == "/search":
+            try:
+                arguments = search_arguments(parse_qs(url.query))
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+                return
+            start = time.perf_counter()
+            total, records = index.search(**arguments)
+            took_ms = (time.perf_counter() - start) * 1000
+            self.send_json(200, {"total": total, "took_ms": round(took_ms, 3),
+                                 "cards": [record.to_dict() for record in records]})
+        elif url.path == "/stats":
+            self.send_json(200, index.stats())
+        else:
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Reload regenerated CSVs every interval seconds until stop is set
+def watch(index, interval, stop):
+    while not stop.wait(interval):
+        updated, removed = index.refresh()
+        if updated:
+            print(f"Reloaded {', '.join(updated)}.")
+        if removed:
+            print(f"Removed {', '.join(removed)}.")
+
+
+def serve(index, host=DEFAULT_HOST, port=DEFAULT_PORT, poll_interval=DEFAULT_POLL_INTERVAL):
+    server = ThreadingHTTPServer((host, port), SearchHandler)
+    server.index = index
+    stop = threading.Event()
+    if poll_interval > 0:
+        threading.Thread(target=watch, args=(index, poll_interval, stop), daemon=True).start()
+    print(f"Serving {index.stats()['cards']} cards on http://{host}:{server.server_address[1]}/search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve name, id and filter searches over every per-set CSV as JSON.")
+    parser.add_argument("directories", nargs="*", default=list(SOURCE_DIRS),
+                        help="Directories of set CSVs; later ones win for the same set.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between checks for regenerated CSVs; 0 disables reloading.")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    index = SearchIndex(args.directories)
+    updated, _ = index.refresh()
+    print(f"Loaded {len(updated)} sets in {time.time() - start_time:.2f} seconds.")
+    serve(index, args.host, args.port, args.poll)
@@ -1,8 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
 
-RATE=0.0087
-
 def is_japanese_char(char):
     """Check if a character is Japanese."""
     codepoint = ord(char)
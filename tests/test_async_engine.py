@@ -0,0 +1,95 @@
+"""The asyncio engine against the benchmark fixtures served by a local stub HTTP server.
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import async_scraper  # noqa: E402
+import data_scraper  # noqa: E402
+import http_client  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from run_benchmarks import FIXTURE_DIR, SET_KEY, FixtureAdapter  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers fandom paths (/wiki/...) and yuyu-tei paths (/sell/...) with the saved fixtures."""
+
+    router = FixtureAdapter()
+
+    def do_GET(self):
+        # FixtureAdapter picks the page from the path, and from the host for yuyu-tei
+        host = "https://yuyu-tei.jp" if self.path.startswith("/sell/") else "https://duelmasters.fandom.com"
+        with open(os.path.join(FIXTURE_DIR, self.router.route(host + self.path.split("?", 1)[0])), "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AsyncEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.set_url = f"{base_url}/wiki/{SET_KEY}_Abyss_Revolution"
+
+        self.saved = (data_scraper.YUYUTEI_SEARCH_URL, data_scraper.YUYUTEI_SET_URL, os.getcwd())
+        data_scraper.YUYUTEI_SEARCH_URL = f"{base_url}/sell/dm/s/search?search_word="
+        data_scraper.YUYUTEI_SET_URL = f"{base_url}/sell/dm/s/"
+        data_scraper.set_card_index(None)
+        http_client.set_transport(None)
+        http_client.set_cache(None)
+        http_client.set_rate_limiter(RateLimiter({}, 1e9))
+
+        # Generated CSVs and journals go to a scratch directory
+        self.workdir = tempfile.TemporaryDirectory()
+        os.chdir(self.workdir.name)
+
+    def tearDown(self):
+        data_scraper.YUYUTEI_SEARCH_URL, data_scraper.YUYUTEI_SET_URL, cwd = self.saved
+        os.chdir(cwd)
+        self.workdir.cleanup()
+        http_client.close_sessions()
+        http_client.set_rate_limiter(RateLimiter())
+        self.server.shutdown()
+        self.server.server_close()
+
+    def read_csv(self, key):
+        with open(data_scraper.set_csv_filename(key), encoding="utf-8") as f:
+            # The set column holds the key each copy was written under
+            return f.read().replace(key, "KEY")
+
+    def test_async_matches_sync(self):
+        self.assertTrue(data_scraper.scrape_website(self.set_url, "SYNC"))
+        results = async_scraper.run({"ASYNC": self.set_url, "ASYNC2": self.set_url})
+        self.assertEqual(set(results), {"ASYNC", "ASYNC2"})
+        self.assertTrue(all(results.values()))
+
+        expected = self.read_csv("SYNC")
+        self.assertGreater(expected.count("\n"), 100)
+        self.assertEqual(self.read_csv("ASYNC"), expected)
+        self.assertEqual(self.read_csv("ASYNC2"), expected)
+
+    def test_async_with_set_listing_matches_sync(self):
+        self.assertTrue(data_scraper.scrape_website(self.set_url, "SYNC", use_set_listing=True))
+        results = async_scraper.run({"ASYNC": self.set_url}, use_set_listing=True)
+        self.assertTrue(results["ASYNC"])
+        self.assertEqual(self.read_csv("ASYNC"), self.read_csv("SYNC"))
+
+
+if __name__ == "__main__":
+    unittest.main()
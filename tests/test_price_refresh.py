@@ -0,0 +1,110 @@
+"""Budget accounting and priority order of --refresh-prices, replayed from the benchmark fixtures.
+
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from urllib.parse import unquote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import data_scraper  # noqa: E402
+import http_client  # noqa: E402
+import price_refresh  # noqa: E402
+from price_history import PriceHistory  # noqa: E402
+from rate_limiter import RateLimiter  # noqa: E402
+from run_benchmarks import FixtureAdapter  # noqa: E402
+
+SET_KEY = "TEST-1"
+HEADER = ["No", "Rarity", "Id", "Japanese Name", "English Name", "Civilization", "Set", "Reference",
+          "Price (Yen)", "Qty"]
+# (Japanese name, id, price), most expensive first so priority follows the rows. The fixture
+# search page lists OR1/OR2 and S1/S10 but not the X ids, whatever the search term.
+CARDS = [
+    ("火文字竜", "OR1/OR2", 9000),
+    ("水文字竜", "X1/X9", 8000),
+    ("光文字竜", "X2/X9", 7000),
+    ("闇文字竜", "S1/S10", 6000),
+    ("自然文字", "X3/X9", 5000),
+]
+
+
+class RecordingAdapter(FixtureAdapter):
+    """FixtureAdapter that keeps the search words of the yuyu-tei requests, in order."""
+
+    def __init__(self):
+        super().__init__()
+        self.searches = []
+
+    def send(self, request, **kwargs):
+        if "search_word=" in request.url:
+            self.searches.append(unquote(request.url.split("search_word=", 1)[1]))
+        return super().send(request, **kwargs)
+
+
+class PriceRefreshTest(unittest.TestCase):
+    def setUp(self):
+        self.adapter = RecordingAdapter()
+        http_client.set_transport(self.adapter)
+        http_client.set_cache(None)
+        http_client.set_rate_limiter(RateLimiter({}, 1e9))
+
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.TemporaryDirectory()
+        os.chdir(self.workdir.name)
+        csv_filename = data_scraper.set_csv_filename(SET_KEY)
+        os.makedirs(os.path.dirname(csv_filename), exist_ok=True)
+        with open(csv_filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            for no, (japanese_name, card_id, price) in enumerate(CARDS, 1):
+                writer.writerow([no, "Common", card_id, japanese_name, f"Card {no}", "Fire", SET_KEY, "", price, 0])
+        self.history = PriceHistory("price_history.sqlite3")
+
+    def tearDown(self):
+        self.history.close()
+        os.chdir(self.cwd)
+        self.workdir.cleanup()
+        http_client.set_transport(None)
+        http_client.set_rate_limiter(RateLimiter())
+
+    def refresh(self, budget):
+        self.adapter.searches.clear()
+        sources = {SET_KEY: data_scraper.set_csv_filename(SET_KEY)}
+        return price_refresh.refresh_prices(sources, self.history, budget, workers=1, jsonl=False)
+
+    def test_plan_holds_back_lookups(self):
+        candidates = price_refresh.load_candidates({SET_KEY: [
+            {"Id": card_id, "Japanese Name": name, "Price (Yen)": str(price), "Rarity": "Common"}
+            for name, card_id, price in CARDS]}, self.history)
+        planned = price_refresh.plan_refresh(candidates, 4)
+        self.assertEqual([row["Id"] for _, row, _ in planned], ["OR1/OR2", "X1/X9", "X2/X9"])
+        self.assertEqual([search_term for _, _, search_term in planned], ["火文", "水文", "光文"])
+
+    def test_searches_then_lookups_within_budget(self):
+        self.refresh(4)
+        # Three searches by priority, then the one request held back goes to the most urgent miss
+        self.assertEqual(self.adapter.searches, ["火文", "水文", "光文", "水文 X1/X9"])
+
+        # Every planned card counts as checked, the miss left without a lookup included
+        self.assertEqual(set(self.history.last_checked(SET_KEY)), {"OR1/OR2", "X1/X9", "X2/X9"})
+
+        # So the next run starts with the cards that were not planned yet
+        self.refresh(4)
+        self.assertLessEqual(len(self.adapter.searches), 4)
+        self.assertEqual(self.adapter.searches[:2], ["闇文", "自然"])
+
+    def test_small_budgets(self):
+        self.refresh(1)
+        self.assertEqual(self.adapter.searches, ["火文"])
+        self.refresh(0)
+        self.assertEqual(self.adapter.searches, [])
+
+
+if __name__ == "__main__":
+    unittest.main()